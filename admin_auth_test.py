@@ -7,6 +7,8 @@ Tests all authentication scenarios including login, token verification, protecte
 import requests
 import json
 import uuid
+import base64
+import hashlib
 from datetime import datetime
 import time
 
@@ -431,6 +433,226 @@ class BöttcherWikiAdminAuthTester:
             
         return False
         
+    def test_bulk_import(self):
+        """Test POST /api/knowledge/bulk with NDJSON including an invalid record"""
+        if not self.admin_token:
+            self.log_test("Bulk Import", False, "No admin token available")
+            return False
+            
+        records = [
+            {"question": "Bulk Test Frage 1", "answer": "Antwort 1", "category": "IT-Support", "tags": ["bulk"]},
+            {"question": "Bulk Test Frage 2", "answer": "Antwort 2", "category": "Wartung", "tags": ["bulk"]},
+            {"question": "Ohne Antwort", "category": "Wartung"}
+        ]
+        body = "\n".join(json.dumps(record) for record in records)
+        
+        try:
+            response = requests.post(
+                f"{self.base_url}/knowledge/bulk",
+                data=body.encode("utf-8"),
+                headers={
+                    "Authorization": f"Bearer {self.admin_token}",
+                    "Content-Type": "application/x-ndjson"
+                },
+                timeout=30
+            )
+            
+            if response.status_code != 200:
+                self.log_test("Bulk Import", False, f"Status code: {response.status_code}")
+                return False
+                
+            data = response.json()
+            statuses = [result["status"] for result in data.get("results", [])]
+            created_ids = [result["id"] for result in data.get("results", []) if result["status"] == "created"]
+            
+            # Clean up the imported entries
+            for entry_id in created_ids:
+                requests.delete(
+                    f"{self.base_url}/knowledge/{entry_id}",
+                    headers={"Authorization": f"Bearer {self.admin_token}"},
+                    timeout=10
+                )
+            
+            if data.get("created") == 2 and data.get("failed") == 1 and statuses == ["created", "created", "error"]:
+                self.log_test("Bulk Import", True, "2 entries created, invalid record reported")
+                return True
+            else:
+                self.log_test("Bulk Import", False, f"Unexpected report: {data}")
+                
+        except Exception as e:
+            self.log_test("Bulk Import", False, f"Error: {str(e)}")
+        return False
+        
+    def test_bulk_import_aware_timestamps(self):
+        """Test that imported timestamps with a UTC offset keep search and suggestions working"""
+        if not self.admin_token:
+            self.log_test("Bulk Import Aware Timestamps", False, "No admin token available")
+            return False
+            
+        record = {
+            "question": "Zeitzonen Testeintrag",
+            "answer": "Importiert mit Zeitzone",
+            "category": "IT-Support",
+            "created_at": "2024-03-01T08:00:00Z",
+            "updated_at": "2024-03-01T10:00:00+02:00"
+        }
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        
+        try:
+            response = requests.post(
+                f"{self.base_url}/knowledge/bulk",
+                data=json.dumps(record).encode("utf-8"),
+                headers={**headers, "Content-Type": "application/x-ndjson"},
+                timeout=30
+            )
+            if response.status_code != 200 or response.json().get("created") != 1:
+                self.log_test("Bulk Import Aware Timestamps", False, f"Import failed: {response.text}")
+                return False
+            entry_id = response.json()["results"][0]["id"]
+            
+            # Both rank against entries with naive timestamps
+            search = requests.post(f"{self.base_url}/search", json={"query": "Testeintrag"}, timeout=10)
+            suggest = requests.get(f"{self.base_url}/suggest", params={"q": "Zeit"}, timeout=10)
+            
+            requests.delete(f"{self.base_url}/knowledge/{entry_id}", headers=headers, timeout=10)
+            
+            if search.status_code == 200 and suggest.status_code == 200:
+                matches = [result for result in search.json() if result.get("id") == entry_id]
+                created_at = matches[0].get("created_at", "") if matches else ""
+                if created_at.startswith("2024-03-01T08:00:00") and not created_at.endswith("Z"):
+                    self.log_test("Bulk Import Aware Timestamps", True, "Timestamps stored as naive UTC, search works")
+                    return True
+                self.log_test("Bulk Import Aware Timestamps", False, f"Unexpected created_at: {created_at}")
+            else:
+                self.log_test("Bulk Import Aware Timestamps", False,
+                              f"Search: {search.status_code}, Suggest: {suggest.status_code}")
+                
+        except Exception as e:
+            self.log_test("Bulk Import Aware Timestamps", False, f"Error: {str(e)}")
+        return False
+        
+    def test_bulk_import_export_format(self):
+        """Test that an export can be re-imported and repeated ids are rejected"""
+        if not self.admin_token:
+            self.log_test("Bulk Import Export Format", False, "No admin token available")
+            return False
+            
+        entry_id = str(uuid.uuid4())
+        entry = {"id": entry_id, "question": "Export Testeintrag", "answer": "Aus einem Export", "category": "Wartung"}
+        records = [
+            {"type": "export", "version": 1, "exported_at": "2024-01-01T00:00:00", "attachments": False},
+            {"type": "entry", "entry": entry},
+            {"type": "entry", "entry": {**entry, "question": "Gleiche ID"}}
+        ]
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        
+        try:
+            response = requests.post(
+                f"{self.base_url}/knowledge/bulk",
+                data="\n".join(json.dumps(record) for record in records).encode("utf-8"),
+                headers={**headers, "Content-Type": "application/x-ndjson"},
+                timeout=30
+            )
+            requests.delete(f"{self.base_url}/knowledge/{entry_id}", headers=headers, timeout=10)
+            
+            if response.status_code != 200:
+                self.log_test("Bulk Import Export Format", False, f"Status code: {response.status_code}")
+                return False
+            data = response.json()
+            statuses = [(result["index"], result["status"]) for result in data.get("results", [])]
+            if statuses == [(1, "created"), (2, "error")]:
+                self.log_test("Bulk Import Export Format", True, "Export records imported, repeated id rejected")
+                return True
+            self.log_test("Bulk Import Export Format", False, f"Unexpected report: {data}")
+                
+        except Exception as e:
+            self.log_test("Bulk Import Export Format", False, f"Error: {str(e)}")
+        return False
+        
+    def test_bulk_import_broken_file(self):
+        """Test that a file failing to restore rejects its own entry only"""
+        if not self.admin_token:
+            self.log_test("Bulk Import Broken File", False, "No admin token available")
+            return False
+            
+        first_id, second_id = str(uuid.uuid4()), str(uuid.uuid4())
+        content = b"Inhalt der Anleitung"
+        attachment = {"id": str(uuid.uuid4()), "filename": "anleitung.txt", "file_type": "documents",
+                      "file_size": len(content), "content_type": "text/plain"}
+        records = [
+            {"type": "export", "version": 1, "exported_at": "2024-01-01T00:00:00", "attachments": True},
+            {"type": "entry", "entry": {"id": first_id, "question": "Mit Anhang", "answer": "A",
+                                        "category": "Wartung", "attachments": [attachment]}},
+            {"type": "file", "id": attachment["id"], "entry_id": first_id, "filename": "anleitung.txt",
+             "content_type": "text/plain", "length": len(content), "sha256": hashlib.sha256(content).hexdigest()},
+            # Corrupted on the way: the hash no longer matches
+            {"type": "chunk", "sha256": hashlib.sha256(content).hexdigest(), "n": 0,
+             "data": base64.b64encode(content[:-1] + b"X").decode("ascii")},
+            {"type": "entry", "entry": {"id": second_id, "question": "Ohne Anhang", "answer": "B", "category": "Wartung"}}
+        ]
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        
+        try:
+            response = requests.post(
+                f"{self.base_url}/knowledge/bulk",
+                data="\n".join(json.dumps(record) for record in records).encode("utf-8"),
+                headers={**headers, "Content-Type": "application/x-ndjson"},
+                timeout=30
+            )
+            for entry_id in (first_id, second_id):
+                requests.delete(f"{self.base_url}/knowledge/{entry_id}", headers=headers, timeout=10)
+            
+            if response.status_code != 200:
+                self.log_test("Bulk Import Broken File", False, f"Status code: {response.status_code}")
+                return False
+            data = response.json()
+            statuses = [(result["index"], result["status"]) for result in data.get("results", [])]
+            if statuses == [(1, "error"), (2, "error"), (4, "created")]:
+                self.log_test("Bulk Import Broken File", True, "Broken file reported, only its entry rejected")
+                return True
+            self.log_test("Bulk Import Broken File", False, f"Unexpected report: {data}")
+                
+        except Exception as e:
+            self.log_test("Bulk Import Broken File", False, f"Error: {str(e)}")
+        return False
+        
+    def test_logout_revokes_token(self):
+        """Test that POST /api/admin/logout invalidates the token immediately"""
+        try:
+            # Use a separate session so the shared admin token stays valid
+            response = requests.post(
+                f"{self.base_url}/admin/login",
+                json={"username": "admin", "password": "boettcher2024"},
+                timeout=10
+            )
+            if response.status_code != 200:
+                self.log_test("Logout Revokes Token", False, f"Login failed: {response.status_code}")
+                return False
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            
+            # Verify twice so the second request is answered from the token cache
+            for _ in range(2):
+                response = requests.get(f"{self.base_url}/admin/verify", headers=headers, timeout=10)
+                if response.status_code != 200:
+                    self.log_test("Logout Revokes Token", False, f"Fresh token rejected: {response.status_code}")
+                    return False
+            
+            response = requests.post(f"{self.base_url}/admin/logout", headers=headers, timeout=10)
+            if response.status_code != 200:
+                self.log_test("Logout Revokes Token", False, f"Logout failed: {response.status_code}")
+                return False
+            
+            response = requests.get(f"{self.base_url}/admin/verify", headers=headers, timeout=10)
+            if response.status_code == 401:
+                self.log_test("Logout Revokes Token", True, "Token rejected after logout")
+                return True
+            else:
+                self.log_test("Logout Revokes Token", False, f"Expected 401 after logout, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_test("Logout Revokes Token", False, f"Error: {str(e)}")
+        return False
+        
     def run_all_tests(self):
         """Run all authentication tests in sequence"""
         print("=" * 70)
@@ -448,7 +670,12 @@ class BöttcherWikiAdminAuthTester:
             ("Protected Routes - Without Auth", self.test_protected_routes_without_auth),
             ("Protected Routes - Invalid Auth", self.test_protected_routes_with_invalid_auth),
             ("Public Routes - No Auth Required", self.test_public_routes_no_auth),
-            ("JWT Token Structure", self.test_jwt_token_structure)
+            ("JWT Token Structure", self.test_jwt_token_structure),
+            ("Bulk Import", self.test_bulk_import),
+            ("Bulk Import Aware Timestamps", self.test_bulk_import_aware_timestamps),
+            ("Bulk Import Export Format", self.test_bulk_import_export_format),
+            ("Bulk Import Broken File", self.test_bulk_import_broken_file),
+            ("Logout Revokes Token", self.test_logout_revokes_token)
         ]
         
         passed_tests = 0
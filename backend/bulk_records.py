@@ -0,0 +1,197 @@
+"""Incremental parsing of bulk request bodies
+
+A body is either NDJSON (one JSON value per line) or a single JSON array.
+Records are parsed as the body streams in, so a large import never has to
+be held in memory as a whole. Each record is yielded as (index, value,
+error); a broken NDJSON line only fails that record, while a syntax error
+in an array ends parsing because the following records cannot be located.
+"""
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import codecs
+import json
+import re
+
+# Largest amount of unparsed text kept while waiting for a record to complete
+MAX_RECORD_CHARS = 20 * 1024 * 1024
+
+# Array mode finds the end of a record by scanning only the newly received
+# text for the characters that matter, carrying the state between chunks.
+# A record is decoded once, when it is complete.
+NON_SPACE = re.compile(r"\S")
+STRUCTURAL_CHARS = re.compile(r'[\[\]{}"]')
+STRING_CHARS = re.compile(r'["\\]')
+SCALAR_END = re.compile(r"[\s,\]}]")
+
+Record = Tuple[int, Any, Optional[str]]
+
+
+class RecordParser:
+    def __init__(self):
+        self.pieces: List[str] = []  # Text received so far of the incomplete record
+        self.pending_chars = 0
+        self.mode: Optional[str] = None  # "lines" or "array"
+        self.expect_value = True  # array mode: value (or "]") next, else "," or "]"
+        self.in_value = False
+        self.scalar = False  # Current value is a number or literal
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.done = False
+        self.index = 0
+
+    def record(self, value: Any = None, error: Optional[str] = None) -> Record:
+        record = (self.index, value, error)
+        self.index += 1
+        return record
+
+    def collect(self, text: str):
+        if text:
+            self.pieces.append(text)
+            self.pending_chars += len(text)
+
+    def take(self, text: str = "") -> str:
+        """Return the collected record text (plus text) and start a new record"""
+        self.pieces.append(text)
+        collected = "".join(self.pieces)
+        self.pieces = []
+        self.pending_chars = 0
+        return collected
+
+    def feed(self, text: str, final: bool = False) -> List[Record]:
+        if self.done:
+            return []
+        if self.mode is None:
+            text = text.lstrip()
+            if not text:
+                return []
+            self.mode = "array" if text[0] == "[" else "lines"
+            if self.mode == "array":
+                text = text[1:]
+
+        records = self.feed_lines(text, final) if self.mode == "lines" else self.feed_array(text, final)
+        if not self.done and self.pending_chars > MAX_RECORD_CHARS:
+            records.append(self.record(error="Datensatz zu groß"))
+            self.done = True
+        return records
+
+    def parse_line(self, line: str, records: List[Record]):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            records.append(self.record(json.loads(line)))
+        except ValueError as e:
+            records.append(self.record(error=f"Ungültiges JSON: {e}"))
+
+    def feed_lines(self, text: str, final: bool) -> List[Record]:
+        records = []
+        position = 0
+        while True:
+            newline = text.find("\n", position)
+            if newline < 0:
+                break
+            self.parse_line(self.take(text[position:newline]), records)
+            position = newline + 1
+        self.collect(text[position:])
+        if final and self.pieces:
+            self.parse_line(self.take(), records)
+        return records
+
+    def scan_value(self, text: str, position: int) -> Optional[int]:
+        """Continue scanning the current value; return the index after its end if it ends in text"""
+        while position < len(text):
+            if self.escape:
+                self.escape = False
+                position += 1
+            elif self.in_string:
+                match = STRING_CHARS.search(text, position)
+                if not match:
+                    return None
+                position = match.end()
+                if match.group() == "\\":
+                    self.escape = True
+                else:
+                    self.in_string = False
+                    if self.depth == 0:
+                        return position
+            elif self.scalar:
+                match = SCALAR_END.search(text, position)
+                return match.start() if match else None
+            else:
+                match = STRUCTURAL_CHARS.search(text, position)
+                if not match:
+                    return None
+                position = match.end()
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                elif char in "[{":
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth <= 0:
+                        return position
+        return None
+
+    def decode_value(self, text: str, records: List[Record]):
+        self.in_value = False
+        self.expect_value = False
+        try:
+            records.append(self.record(json.loads(text)))
+        except ValueError as e:
+            # The following records cannot be located reliably
+            records.append(self.record(error=f"Ungültiges JSON: {e}"))
+            self.done = True
+
+    def feed_array(self, text: str, final: bool) -> List[Record]:
+        records = []
+        position = 0
+        while not self.done and position < len(text):
+            start = 0
+            if not self.in_value:
+                match = NON_SPACE.search(text, position)
+                if not match:
+                    break
+                position = match.start()
+                char = text[position]
+                if char == "]":
+                    self.done = True
+                    break
+                if not self.expect_value:
+                    if char != ",":
+                        records.append(self.record(error="Ungültiges JSON: ',' oder ']' erwartet"))
+                        self.done = True
+                        break
+                    position += 1
+                    self.expect_value = True
+                    continue
+                self.in_value = True
+                self.scalar = char not in '[{"'
+                self.depth = 0
+                start = position
+
+            end = self.scan_value(text, position)
+            if end is None:
+                self.collect(text[start:])
+                break
+            self.decode_value(self.take(text[start:end]), records)
+            position = end
+
+        if final and not self.done:
+            if self.in_value:
+                self.decode_value(self.take(), records)
+            if not self.done:
+                records.append(self.record(error="Ungültiges JSON: ']' fehlt"))
+                self.done = True
+        return records
+
+
+async def iter_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Parse a streamed NDJSON or JSON array body into (index, value, error) records"""
+    parser = RecordParser()
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in chunks:
+        for record in parser.feed(text_decoder.decode(chunk)):
+            yield record
+    for record in parser.feed(text_decoder.decode(b"", final=True), final=True):
+        yield record
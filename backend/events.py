@@ -0,0 +1,67 @@
+"""Fan-out of change events to server-sent event (SSE) subscribers
+
+Every connected client gets its own bounded queue. A client that falls too
+far behind is not allowed to hold up the others: its queue is cleared and
+it receives a single "reset" event telling it to reload everything.
+"""
+from typing import Optional, Set
+import asyncio
+import json
+
+SUBSCRIBER_QUEUE_SIZE = 100
+RESET_EVENT = {"type": "reset"}
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_EVENT)
+
+
+class EventBroker:
+    def __init__(self):
+        self.subscriptions: Set[Subscription] = set()
+        # True while a change stream delivers events written by any worker
+        self.shared = False
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: dict):
+        for subscription in list(self.subscriptions):
+            subscription.deliver(event)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscriptions), "shared": self.shared}
+
+
+def format_sse(event: dict) -> str:
+    """Encode an event as an SSE message named after its type"""
+    data = json.dumps({key: value for key, value in event.items() if key != "type"}, ensure_ascii=False)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def stream_events(subscription: Subscription, keepalive_seconds: float, retry_ms: Optional[int] = None):
+    """Yield SSE messages for a subscription, with comment lines as keepalive"""
+    if retry_ms:
+        yield f"retry: {retry_ms}\n\n"
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive_seconds)
+        except asyncio.TimeoutError:
+            # Keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            continue
+        yield format_sse(event)
@@ -0,0 +1,259 @@
+"""CPU-heavy media work that runs in worker processes
+
+Decoding, resizing and encoding images holds the GIL for hundreds of
+milliseconds on large photos, so the API hands these functions to a
+bounded process pool instead of running them on the event loop. The worker
+functions take and return plain bytes/strings so they can be pickled.
+Rendered derivatives are kept in a size-bounded disk cache. Text extraction
+from document attachments for the search index runs in the same pool.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import base64
+import io
+import multiprocessing
+import os
+import threading
+import uuid
+import zipfile
+from xml.etree import ElementTree
+
+from PIL import Image, ImageOps
+from pypdf import PdfReader
+
+# Output formats for derivatives: Pillow format name and media type
+DERIVATIVE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+DERIVATIVE_QUALITY = 82
+
+# Document formats text can be extracted from, by content type
+TEXT_EXTRACTION_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "txt",
+}
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Upper bound for the uncompressed main part of a DOCX (guards against zip bombs)
+MAX_DOCX_XML_BYTES = 64 * 1024 * 1024
+
+
+def create_thumbnail(image_data: bytes, max_size: tuple = (200, 200)) -> Optional[str]:
+    """Create a base64 JPEG thumbnail for image files"""
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        # Let JPEG decoding downscale early instead of materializing full-size pixels
+        image.draft('RGB', max_size)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        # Convert to RGB if necessary
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGB')
+
+        # Save as JPEG
+        thumb_io = io.BytesIO()
+        image.save(thumb_io, format='JPEG', quality=85)
+        thumb_io.seek(0)
+
+        return base64.b64encode(thumb_io.getvalue()).decode('utf-8')
+    except Exception as e:
+        print(f"Error creating thumbnail: {e}")
+        return None
+
+
+def render_derivative(image_data: bytes, width: Optional[int], height: Optional[int], fmt: str) -> Optional[bytes]:
+    """Resize an image to fit within width x height and encode it as fmt
+
+    Missing dimensions are unconstrained and images are never upscaled.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        size = (width or image.width, height or image.height)
+        image.draft('RGB', size)
+        # Photos from phones are often stored rotated with an EXIF hint
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+        pil_format = DERIVATIVE_FORMATS[fmt][0]
+        if pil_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+
+        output = io.BytesIO()
+        image.save(output, format=pil_format, quality=DERIVATIVE_QUALITY)
+        return output.getvalue()
+    except Exception as e:
+        print(f"Error rendering image derivative: {e}")
+        return None
+
+
+def extract_text(data: bytes, kind: str, max_chars: int) -> Optional[str]:
+    """Extract plain text from a document (see TEXT_EXTRACTION_TYPES)
+
+    The text is truncated to max_chars. Returns None if the document
+    cannot be read.
+    """
+    try:
+        if kind == "pdf":
+            parts = []
+            length = 0
+            for page in PdfReader(io.BytesIO(data)).pages:
+                text = page.extract_text() or ""
+                parts.append(text)
+                length += len(text)
+                if length >= max_chars:
+                    break
+            text = "\n".join(parts)
+        elif kind == "docx":
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                with archive.open("word/document.xml") as document:
+                    xml = document.read(MAX_DOCX_XML_BYTES + 1)
+            if len(xml) > MAX_DOCX_XML_BYTES:
+                raise ValueError("word/document.xml too large")
+            paragraphs = []
+            for paragraph in ElementTree.fromstring(xml).iter(f"{WORD_NAMESPACE}p"):
+                paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{WORD_NAMESPACE}t")))
+            text = "\n".join(paragraphs)
+        else:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                # Older Windows tools still write text files in CP1252
+                text = data.decode("cp1252", errors="replace")
+        return text[:max_chars]
+    except Exception as e:
+        print(f"Error extracting {kind} text: {e}")
+        return None
+
+
+class DerivativeCache:
+    """Size-bounded LRU cache of rendered derivatives on disk
+
+    Keys are file names; the access order lives in memory and is rebuilt
+    from file modification times on load. When the total size exceeds
+    max_bytes the least recently used files are deleted. Reads and writes
+    may run in worker threads, so the bookkeeping is guarded by a lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            for _, name, size in sorted(files):
+                self.entries[name] = size
+                self.total_bytes += size
+            self.evict()
+
+    def read(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(os.path.join(self.directory, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted between the lookup and the read
+            return None
+
+    def write(self, key: str, data: bytes):
+        # Write to a temporary name first so readers never see partial files
+        tmp_path = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.directory, key))
+
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self.evict()
+
+    def evict(self):
+        # Caller holds the lock
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, key))
+            except FileNotFoundError:
+                pass
+
+
+class MediaPoolBusy(Exception):
+    """Raised when the media queue is full and the task was not accepted"""
+
+
+class MediaPool:
+    """Bounded process pool for media tasks with a queue-depth limit
+
+    At most `queue_limit` tasks may be running or waiting at once; further
+    submissions are rejected with MediaPoolBusy so callers can shed load
+    instead of piling up work behind a slow pool.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        # Spawn fresh interpreters: forking a process that already runs an
+        # event loop and database driver threads is not safe
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, func, *args):
+        """Run func(*args) in a worker process and wait for its result"""
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise MediaPoolBusy()
+        if self.executor is None:
+            self.start()
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "queue_limit": self.queue_limit,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,84 @@
+"""In-process TTL + LRU cache for public read endpoints
+
+Cached values are tagged with the generation they were computed in. Every
+write bumps the generation, which invalidates everything at once. With a
+shared collection the generation lives in MongoDB, so a write in one
+worker invalidates the caches of all workers within one poll interval.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+from pymongo import ReturnDocument
+
+SHARED_GENERATION_ID = "responses"
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, shared_collection=None, poll_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_collection = shared_collection
+        self.poll_interval = poll_interval
+        self.generation = 0
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.last_poll = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def set_generation(self, generation: int):
+        if generation != self.generation:
+            self.generation = generation
+            self.entries.clear()
+
+    async def refresh(self):
+        """Pick up invalidations made by other workers"""
+        if self.shared_collection is None:
+            return
+        now = time.monotonic()
+        if now - self.last_poll < self.poll_interval:
+            return
+        self.last_poll = now
+        state = await self.shared_collection.find_one({"_id": SHARED_GENERATION_ID})
+        self.set_generation(state["generation"] if state else 0)
+
+    async def invalidate(self):
+        """Drop all cached responses after a write"""
+        if self.shared_collection is None:
+            self.set_generation(self.generation + 1)
+            return
+        state = await self.shared_collection.find_one_and_update(
+            {"_id": SHARED_GENERATION_ID},
+            {"$inc": {"generation": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.set_generation(state["generation"])
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        await self.refresh()
+        cached = self.entries.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return cached[1]
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """Store a value computed during `generation`; stale results are dropped"""
+        if generation != self.generation:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,615 @@
+"""In-memory inverted index with BM25 ranking for the knowledge base search
+
+Text is analyzed for German at index time: umlauts and ß are folded, words
+are reduced with a Snowball-style stemmer and compounds are split into
+their known parts, so queries only need the same cheap analysis.
+"""
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import math
+import re
+
+# Field weights: a hit in the question counts more than one in the answer
+FIELD_WEIGHTS = {
+    "question": 2.0,
+    "tags": 1.5,
+    "answer": 1.0,
+    "attachments": 0.5,
+}
+
+# Fields left out of the BM25 length normalization: text extracted from a
+# long manual would otherwise push its entry down for every other query.
+# Term frequency saturation still bounds what such a field can contribute.
+UNNORMALIZED_FIELDS = {"attachments"}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Query terms shorter than this are not expanded to longer vocabulary terms
+MIN_PREFIX_LENGTH = 3
+
+# Compound splitting: minimum part length, linking elements ("Fugenelemente")
+# and the weight of a part relative to the whole word
+MIN_COMPOUND_PART = 4
+LINKING_ELEMENTS = ("", "s", "es", "n", "en", "e", "er")
+COMPOUND_PART_WEIGHT = 0.5
+
+# Fuzzy matching: words shorter than FUZZY_MIN_LENGTH must match exactly,
+# longer ones allow one edit, words from FUZZY_TWO_EDITS_LENGTH on two edits.
+# Fuzzy hits count less than exact ones and at most FUZZY_MAX_CANDIDATES
+# vocabulary terms are checked with the edit distance per query term.
+FUZZY_MIN_LENGTH = 4
+FUZZY_TWO_EDITS_LENGTH = 8
+FUZZY_MATCH_WEIGHT = 0.6
+FUZZY_MAX_CANDIDATES = 64
+
+# Autocomplete: longest indexed title suffix and the number of sorted keys
+# scanned per lookup, which bounds the cost of very short prefixes
+SUGGEST_KEY_LENGTH = 64
+SUGGEST_MAX_SCAN = 256
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+WORD_START_PATTERN = re.compile(r"(?<!\w)\w", re.UNICODE)
+
+GERMAN_STOPWORDS = frozenset("""
+    aber alle als also am an auch auf aus bei bin bis bist da damit dann das dass
+    dein dem den der des die dies diese dieser dieses doch dort du durch ein eine
+    einem einen einer eines er es für hat hatte hier ich ihr im in ist ja jede
+    jeder jedes kann kein keine man mit muss nach nicht noch nur ob oder ohne sich
+    sie sind so soll über um und uns unter vom von vor wann war was wenn wer wie
+    wir wird wo zu zum zur
+""".split())
+
+# Snowball German stemmer
+VOWELS = "aeiouyäöü"
+S_ENDINGS = "bdfghklmnrt"
+ST_ENDINGS = "bdfghklmnt"
+UMLAUT_FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "U": "u", "Y": "y"})
+TEXT_FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def region_start(word: str, start: int) -> int:
+    """Position after the first non-vowel following a vowel, searching from start"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def strip_suffix(word: str, suffixes: Tuple[str, ...], region: int) -> Tuple[str, Optional[str]]:
+    """Find the longest matching suffix and report it if it lies inside the region"""
+    for suffix in suffixes:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= region:
+                return word, suffix
+            return word, None
+    return word, None
+
+
+@lru_cache(maxsize=65536)
+def german_stem(word: str) -> str:
+    """Stem a lowercase German word following the Snowball algorithm
+
+    Spelled-out umlauts (ae, oe, ue) are treated like umlauts and umlauts and
+    ß are folded to ae/oe/ue/ss, so "Prüfung", "Pruefung" and "Prüfungen" all
+    end up as the same term.
+    """
+    word = word.replace("ß", "ss")
+
+    # Protect u and y between vowels from being treated as vowels
+    chars = list(word)
+    for i in range(1, len(chars) - 1):
+        if chars[i] in "uy" and chars[i - 1] in VOWELS and chars[i + 1] in VOWELS:
+            chars[i] = chars[i].upper()
+    word = "".join(chars)
+    word = re.sub(r"(?<!q)ue", "ü", word).replace("ae", "ä").replace("oe", "ö")
+
+    r1 = region_start(word, 0)
+    r2 = region_start(word, r1)
+    r1 = max(r1, 3)
+
+    # Step 1: inflectional endings
+    word, suffix = strip_suffix(word, ("ern", "em", "er", "en", "es", "e", "s"), r1)
+    if suffix in ("em", "ern", "er"):
+        word = word[:-len(suffix)]
+    elif suffix in ("e", "en", "es"):
+        word = word[:-len(suffix)]
+        if word.endswith("niss"):
+            word = word[:-1]
+    elif suffix == "s" and len(word) > 1 and word[-2] in S_ENDINGS:
+        word = word[:-1]
+
+    # Step 2: comparative and superlative endings
+    word, suffix = strip_suffix(word, ("est", "en", "er", "st"), r1)
+    if suffix in ("en", "er", "est"):
+        word = word[:-len(suffix)]
+    elif suffix == "st" and len(word) >= 6 and word[-3] in ST_ENDINGS:
+        word = word[:-2]
+
+    # Step 3: derivational endings
+    word, suffix = strip_suffix(word, ("isch", "lich", "heit", "keit", "end", "ung", "ig", "ik"), r2)
+    if suffix in ("end", "ung"):
+        word = word[:-3]
+        if word.endswith("ig") and not word.endswith("eig") and len(word) - 2 >= r2:
+            word = word[:-2]
+    elif suffix in ("ig", "ik", "isch"):
+        if not word[:-len(suffix)].endswith("e"):
+            word = word[:-len(suffix)]
+    elif suffix in ("lich", "heit"):
+        word = word[:-4]
+        if word.endswith(("er", "en")) and len(word) - 2 >= r1:
+            word = word[:-2]
+    elif suffix == "keit":
+        word = word[:-4]
+        for ending in ("lich", "ig"):
+            if word.endswith(ending) and len(word) - len(ending) >= r2:
+                word = word[:-len(ending)]
+                break
+
+    return word.translate(UMLAUT_FOLDING)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    """Character trigrams of a term, padded so that word starts and ends count"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edit_distance(term: str) -> int:
+    """Number of typos tolerated for a term of this length"""
+    if len(term) < FUZZY_MIN_LENGTH:
+        return 0
+    if len(term) < FUZZY_TWO_EDITS_LENGTH:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Optimal string alignment distance of a and b, or None if above max_distance
+
+    Insertions, deletions, substitutions and transpositions of neighbouring
+    letters count as one edit. Gives up as soon as a whole row exceeds the bound.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return None
+        before_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+def split_compound(word: str, lexicon: Set[str]) -> Optional[List[str]]:
+    """Split a German compound into the stems of its known parts
+
+    "schweißmaschine" becomes ["schweiss", "maschin"] when both parts occur
+    on their own in the lexicon. The longest known head is tried first and
+    linking elements ("Wartung-s-intervall") are skipped.
+    """
+    for i in range(MIN_COMPOUND_PART, len(word) - MIN_COMPOUND_PART + 1):
+        head = german_stem(word[i:])
+        if head not in lexicon:
+            continue
+
+        modifier = word[:i]
+        for link in LINKING_ELEMENTS:
+            if not modifier.endswith(link) or len(modifier) - len(link) < MIN_COMPOUND_PART:
+                continue
+            core = modifier[:len(modifier) - len(link)]
+            if german_stem(core) in lexicon:
+                return [german_stem(core), head]
+            parts = split_compound(core, lexicon)
+            if parts:
+                return parts + [head]
+    return None
+
+
+def analyze(text: str, lexicon: Set[str], surface_forms: Optional[Dict[str, str]] = None,
+            split_cache: Optional[Dict[str, Optional[List[str]]]] = None) -> Counter:
+    """Turn text into weighted index terms
+
+    Stop words are dropped, words are stemmed and compounds additionally
+    contribute their parts with a lower weight. If surface_forms is given, the
+    first word seen for each stem is recorded in it. split_cache memoizes
+    compound splits and must be cleared whenever the lexicon changes.
+    """
+    terms = Counter()
+    for token in tokenize(text):
+        if token in GERMAN_STOPWORDS:
+            continue
+        stem = german_stem(token)
+        terms[stem] += 1.0
+        if surface_forms is not None:
+            surface_forms.setdefault(stem, token)
+
+        if len(token) >= 2 * MIN_COMPOUND_PART:
+            if split_cache is None:
+                parts = split_compound(token, lexicon)
+            elif token in split_cache:
+                parts = split_cache[token]
+            else:
+                parts = split_cache[token] = split_compound(token, lexicon)
+            for part in parts or []:
+                if part != stem:
+                    terms[part] += COMPOUND_PART_WEIGHT
+    return terms
+
+
+def fold(text: str) -> str:
+    """Lowercase text and fold umlauts and ß for prefix comparisons"""
+    return " ".join(text.lower().translate(TEXT_FOLDING).split())
+
+
+def entry_fields(entry: dict) -> Dict[str, str]:
+    """Extract the searchable text fields of a knowledge entry document"""
+    return {
+        "question": entry.get("question") or "",
+        "answer": entry.get("answer") or "",
+        "tags": " ".join(entry.get("tags") or []),
+        "attachments": entry.get("attachment_text") or "",
+    }
+
+
+class PrefixSuggester:
+    """Sorted-prefix structure for autocompleting question titles and tags
+
+    Every question is stored under each of its word starts ("wie kalibriere
+    ich...", "kalibriere ich...", ...) so typing any word of a title finds it.
+    Keys are folded like search terms; a lookup is a binary search plus a
+    bounded forward scan.
+    """
+
+    def __init__(self):
+        self.title_keys: List[Tuple[str, int, str]] = []  # (folded suffix, word position, doc id)
+        self.titles: Dict[str, str] = {}
+        self.title_created: Dict[str, datetime] = {}
+        self.tag_keys: List[Tuple[str, str]] = []  # (folded tag, tag)
+        self.tag_counts: Counter = Counter()
+        self.doc_tags: Dict[str, List[str]] = {}
+
+    def title_suffixes(self, title: str) -> List[Tuple[str, int]]:
+        folded = fold(title)
+        return [
+            (folded[match.start():match.start() + SUGGEST_KEY_LENGTH], position)
+            for position, match in enumerate(WORD_START_PATTERN.finditer(folded))
+        ]
+
+    def rebuild(self, entries: Iterable[dict]):
+        self.__init__()
+        self.add_many(entries)
+
+    def add_many(self, entries: Iterable[dict]):
+        # Only for entries not indexed yet: keys are appended and sorted once
+        for entry in entries:
+            self.add(entry, keep_sorted=False)
+        self.title_keys.sort()
+        self.tag_keys.sort()
+
+    def add(self, entry: dict, keep_sorted: bool = True):
+        doc_id = entry["id"]
+        self.remove(doc_id)
+        insert = insort if keep_sorted else list.append
+
+        title = entry.get("question") or ""
+        self.titles[doc_id] = title
+        self.title_created[doc_id] = entry.get("created_at") or datetime.min
+        for key, position in self.title_suffixes(title):
+            insert(self.title_keys, (key, position, doc_id))
+
+        tags = list(dict.fromkeys(tag.strip() for tag in entry.get("tags") or [] if tag.strip()))
+        self.doc_tags[doc_id] = tags
+        for tag in tags:
+            if not self.tag_counts[tag]:
+                insert(self.tag_keys, (fold(tag), tag))
+            self.tag_counts[tag] += 1
+
+    def remove(self, doc_id: str):
+        title = self.titles.pop(doc_id, None)
+        if title is not None:
+            self.title_created.pop(doc_id, None)
+            for key, position in self.title_suffixes(title):
+                item = (key, position, doc_id)
+                index = bisect_left(self.title_keys, item)
+                if index < len(self.title_keys) and self.title_keys[index] == item:
+                    del self.title_keys[index]
+
+        for tag in self.doc_tags.pop(doc_id, []):
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+                item = (fold(tag), tag)
+                index = bisect_left(self.tag_keys, item)
+                if index < len(self.tag_keys) and self.tag_keys[index] == item:
+                    del self.tag_keys[index]
+
+    def suggest(self, prefix: str, limit: int = 8) -> Dict[str, list]:
+        """Return the best question titles and tags starting with prefix
+
+        Titles matching from their first word come first, then newer entries;
+        tags are ordered by how many entries use them.
+        """
+        folded = fold(prefix)
+        if not folded:
+            return {"questions": [], "tags": []}
+
+        best_titles: Dict[str, Tuple[int, datetime]] = {}
+        index = bisect_left(self.title_keys, (folded,))
+        for key, position, doc_id in self.title_keys[index:index + SUGGEST_MAX_SCAN]:
+            if not key.startswith(folded):
+                break
+            rank = (0 if position == 0 else 1, self.title_created.get(doc_id, datetime.min))
+            if doc_id not in best_titles or rank[0] < best_titles[doc_id][0]:
+                best_titles[doc_id] = rank
+
+        ordered_titles = sorted(best_titles.items(), key=lambda item: item[1][1], reverse=True)
+        ordered_titles.sort(key=lambda item: item[1][0])
+        questions = [{"id": doc_id, "question": self.titles[doc_id]} for doc_id, _ in ordered_titles[:limit]]
+
+        matching_tags = []
+        index = bisect_left(self.tag_keys, (folded,))
+        for key, tag in self.tag_keys[index:index + SUGGEST_MAX_SCAN]:
+            if not key.startswith(folded):
+                break
+            matching_tags.append(tag)
+        matching_tags.sort(key=lambda tag: self.tag_counts[tag], reverse=True)
+
+        return {"questions": questions, "tags": matching_tags[:limit]}
+
+
+class SearchIndex:
+    """Inverted index over knowledge entries, updated incrementally on writes"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.vocabulary: List[str] = []  # Sorted, for prefix expansion
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_categories: Dict[str, str] = {}
+        self.doc_created: Dict[str, datetime] = {}
+        self.total_length = 0.0
+        self.lexicon: Set[str] = set()  # Known word stems for compound splitting
+        self.split_cache: Dict[str, Optional[List[str]]] = {}
+        self.trigram_index: Dict[str, Set[str]] = {}  # Trigram -> vocabulary terms
+        self.surface_forms: Dict[str, str] = {}  # Stem -> a word it came from, for suggestions
+        self.suggester = PrefixSuggester()
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def rebuild(self, entries: Iterable[dict]):
+        """Replace the index contents with the given entry documents"""
+        self.__init__()
+        entries = list(entries)
+
+        # Learn all words first so compounds can be split regardless of entry order
+        for entry in entries:
+            self.learn_words(entry)
+        for entry in entries:
+            self.add(entry, learn=False)
+        self.suggester.rebuild(entries)
+
+    def add_many(self, entries: Iterable[dict]):
+        """Index many new entry documents at once, e.g. after a bulk import"""
+        entries = list(entries)
+        for entry in entries:
+            self.learn_words(entry)
+        for entry in entries:
+            self.add(entry, learn=False)
+        self.suggester.add_many(entries)
+
+    def learn_words(self, entry: dict):
+        """Add the word stems of an entry to the compound splitting lexicon"""
+        lexicon_size = len(self.lexicon)
+        for text in entry_fields(entry).values():
+            for token in tokenize(text):
+                if len(token) >= MIN_COMPOUND_PART and token not in GERMAN_STOPWORDS:
+                    self.lexicon.add(german_stem(token))
+        if len(self.lexicon) != lexicon_size:
+            self.split_cache.clear()
+
+    def add(self, entry: dict, learn: bool = True):
+        """Index an entry document, replacing a previous version with the same id
+
+        learn=False is used by rebuild, which fills the lexicon and the
+        autocomplete structure in bulk.
+        """
+        doc_id = entry["id"]
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+
+        if learn:
+            self.learn_words(entry)
+        terms = Counter()
+        length = 0.0
+        surface_forms: Dict[str, str] = {}
+        for field, text in entry_fields(entry).items():
+            weight = FIELD_WEIGHTS[field]
+            for term, frequency in analyze(text, self.lexicon, surface_forms, self.split_cache).items():
+                terms[term] += weight * frequency
+                if field not in UNNORMALIZED_FIELDS:
+                    length += weight * frequency
+
+        for term, frequency in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self.add_term(term, surface_forms.get(term))
+            postings[doc_id] = frequency
+
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        self.doc_categories[doc_id] = entry.get("category")
+        self.doc_created[doc_id] = entry.get("created_at") or datetime.min
+        self.total_length += length
+        if learn:
+            self.suggester.add(entry)
+
+    def remove(self, doc_id: str):
+        """Drop an entry from the index"""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                self.remove_term(term)
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_categories.pop(doc_id, None)
+        self.doc_created.pop(doc_id, None)
+        self.suggester.remove(doc_id)
+
+    def add_term(self, term: str, surface_form: Optional[str] = None):
+        """Register a new vocabulary term for prefix and fuzzy lookups"""
+        insort(self.vocabulary, term)
+        for trigram in trigrams(term):
+            self.trigram_index.setdefault(trigram, set()).add(term)
+        if surface_form:
+            self.surface_forms[term] = surface_form
+
+    def remove_term(self, term: str):
+        """Forget a vocabulary term that no entry uses anymore"""
+        index = bisect_left(self.vocabulary, term)
+        if index < len(self.vocabulary) and self.vocabulary[index] == term:
+            del self.vocabulary[index]
+        for trigram in trigrams(term):
+            terms = self.trigram_index.get(trigram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.trigram_index[trigram]
+        self.surface_forms.pop(term, None)
+
+    def prefix_matches(self, term: str) -> List[str]:
+        """Return the vocabulary terms starting with term"""
+        if len(term) < MIN_PREFIX_LENGTH:
+            return []
+
+        matches = []
+        index = bisect_left(self.vocabulary, term)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(term):
+            matches.append(self.vocabulary[index])
+            index += 1
+        return matches
+
+    def fuzzy_matches(self, term: str) -> List[Tuple[str, int]]:
+        """Return vocabulary terms within the allowed edit distance, closest first
+
+        Candidates are preselected through the trigram index: every edit
+        destroys at most four trigrams (a transposition touches two letters),
+        so a term within distance d shares at least len(trigrams) - 4 * d of
+        them. Only the best candidates are then checked with the bounded edit
+        distance.
+        """
+        max_distance = max_edit_distance(term)
+        if not max_distance:
+            return []
+
+        term_trigrams = trigrams(term)
+        shared = Counter()
+        for trigram in term_trigrams:
+            for candidate in self.trigram_index.get(trigram, ()):
+                shared[candidate] += 1
+
+        min_shared = len(term_trigrams) - 4 * max_distance
+        matches = []
+        for candidate, count in shared.most_common(FUZZY_MAX_CANDIDATES):
+            if count < min_shared:
+                break
+            distance = bounded_edit_distance(term, candidate, max_distance)
+            if distance is not None:
+                matches.append((candidate, distance))
+
+        matches.sort(key=lambda match: (match[1], -len(self.postings[match[0]])))
+        return matches
+
+    def expand_term(self, term: str) -> List[Tuple[str, float]]:
+        """Return the vocabulary terms a query term matches, with their weight
+
+        Exact matches win; otherwise the term is treated as a prefix so that
+        e.g. "scan" still finds "scanner", and only then typos are tolerated.
+        """
+        if term in self.postings:
+            return [(term, 1.0)]
+
+        prefix_matches = self.prefix_matches(term)
+        if prefix_matches:
+            return [(match, 1.0) for match in prefix_matches]
+
+        return [(match, FUZZY_MATCH_WEIGHT) for match, _ in self.fuzzy_matches(term)]
+
+    def did_you_mean(self, query: str) -> Optional[str]:
+        """Suggest a corrected query when some of its words are unknown"""
+        corrected = []
+        changed = False
+        for token in tokenize(query):
+            stem = german_stem(token)
+            if token in GERMAN_STOPWORDS or stem in self.postings or self.prefix_matches(stem):
+                corrected.append(token)
+                continue
+
+            replacement = next(
+                (self.surface_forms[match] for match, _ in self.fuzzy_matches(stem) if match in self.surface_forms),
+                None
+            )
+            if replacement:
+                corrected.append(replacement)
+                changed = True
+            else:
+                corrected.append(token)
+
+        return " ".join(corrected) if changed else None
+
+    def suggest(self, prefix: str, limit: int = 8) -> Dict[str, list]:
+        """Autocomplete question titles and tags for a prefix"""
+        return self.suggester.suggest(prefix, limit)
+
+    def search(self, query: str, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Rank entries for a query with BM25, best match first
+
+        Ties are broken by recency and then id so the order is stable across
+        requests, which keyset pagination of search results relies on.
+        """
+        doc_count = len(self.doc_terms)
+        if not doc_count:
+            return []
+        average_length = self.total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        for query_term in analyze(query, self.lexicon, split_cache=self.split_cache):
+            for term, match_weight in self.expand_term(query_term):
+                postings = self.postings[term]
+                idf = match_weight * math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if category and self.doc_categories.get(doc_id) != category:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        return sorted(
+            scores.items(),
+            key=lambda item: (item[1], self.doc_created.get(item[0], datetime.min), item[0]),
+            reverse=True
+        )
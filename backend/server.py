@@ -1,20 +1,37 @@
-from fastapi import FastAPI, HTTPException, status, Depends, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, status, Depends, File, UploadFile, Form, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ValidationError, field_validator
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from bson import Binary
 import uuid
 import re
 import hashlib
+import hmac
+import mimetypes
+import zlib
 import jwt
 import base64
-import io
-from PIL import Image
+import json
+import orjson
+import asyncio
+import time
+from urllib.parse import quote
 import magic
+from search_index import SearchIndex
+from response_cache import ResponseCache
+from events import EventBroker, stream_events
+from bulk_records import iter_records
+from token_cache import TokenCache, token_digest
+from media import (MediaPool, MediaPoolBusy, DerivativeCache, DERIVATIVE_FORMATS, TEXT_EXTRACTION_TYPES,
+                   create_thumbnail, render_derivative, extract_text)
 
 app = FastAPI(title="Böttcher Wiki API", version="1.0.0")
 
@@ -25,21 +42,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Did-You-Mean", "X-Next-Cursor", "ETag", "Upload-Offset", "Upload-Length"],
 )
 
-# MongoDB connection
+# MongoDB connection (async driver, so database calls never block the event loop)
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URL)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+client = AsyncIOMotorClient(MONGO_URL, maxPoolSize=MONGO_MAX_POOL_SIZE, minPoolSize=MONGO_MIN_POOL_SIZE)
 db = client.boettcher_wiki
 knowledge_base = db.knowledge_base
 categories_collection = db.categories
 files_collection = db.files
+file_chunks_collection = db.file_chunks
+blobs_collection = db.blobs
+stats_collection = db.stats
+cache_state_collection = db.cache_state
+events_collection = db.events
+upload_sessions_collection = db.upload_sessions
+attachment_texts_collection = db.attachment_texts
+token_revocations_collection = db.token_revocations
+
+# Search index, kept in sync with knowledge_base on every write
+search_index = SearchIndex()
+MAX_SUGGESTIONS = 20
+SEARCH_INDEX_PROJECTION = {"_id": 0, "id": 1, "question": 1, "answer": 1, "tags": 1, "category": 1, "created_at": 1,
+                           "attachments.sha256": 1}
+
+# Response cache for public reads, invalidated on every write. With
+# RESPONSE_CACHE_SHARED the invalidation generation is kept in MongoDB so
+# several workers stay coherent.
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '256'))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_SHARED = os.environ.get('RESPONSE_CACHE_SHARED', '').lower() in ('1', 'true', 'yes')
+CACHED_RESPONSE_HEADERS = ["X-Next-Cursor"]
+# Public reads may be stored by browsers and proxies but must be revalidated
+# with If-None-Match; the answer then comes from the response cache
+PUBLIC_CACHE_CONTROL = "public, no-cache"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+response_cache = ResponseCache(
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    shared_collection=cache_state_collection if RESPONSE_CACHE_SHARED else None
+)
+
+# Change events for SSE clients. Writes are appended to events_collection and
+# every worker forwards them to its clients through a change stream; without
+# a replica set events are only delivered within the writing process.
+EVENT_RETENTION_SECONDS = 24 * 60 * 60
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_RETRY_MS = 5000
+EVENT_RECONNECT_SECONDS = 5
+CHANGE_STREAMS_UNSUPPORTED = 40573  # Error code on standalone servers
+event_broker = EventBroker()
+event_watcher = None
+
+# NDJSON export
+EXPORT_FORMAT_VERSION = 1
+EXPORT_BATCH_SIZE = 200  # Entries per cursor batch
+EXPORT_FLUSH_BYTES = 64 * 1024  # Encoded records are sent in blocks of about this size
+EXPORT_GZIP_LEVEL = 6
+
+# Bulk import
+BULK_BATCH_SIZE = 500  # Documents per unordered insert_many
 
 # JWT Configuration
 SECRET_KEY = "boettcher-wiki-secret-key-2024"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 
+# Verified tokens are cached per worker; revocations (logout, password
+# change) are stored in MongoDB and picked up by all workers within a second
+TOKEN_CACHE_SIZE = 1024
+token_cache = TokenCache(TOKEN_CACHE_SIZE, token_revocations_collection)
+
 # Security
 security = HTTPBearer()
 
@@ -49,9 +125,58 @@ ALLOWED_EXTENSIONS = {
     'documents': ['pdf', 'doc', 'docx', 'txt', 'rtf'],
     'spreadsheets': ['xls', 'xlsx', 'csv'],
     'presentations': ['ppt', 'pptx'],
+    'videos': ['mp4', 'mov', 'm4v', 'webm'],
     'other': ['zip', 'rar', '7z']
 }
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+BLOB_CHUNK_SIZE = 255 * 1024  # Same default chunk size as GridFS
+MIME_SNIFF_BYTES = 2048
+GENERIC_CONTENT_TYPES = {'application/octet-stream', 'text/plain', 'application/zip'}
+# File classes whose sniffed type only has to match the MIME major type
+MEDIA_MAJOR_TYPES = {'images': 'image/', 'videos': 'video/'}
+
+# Batch uploads: files of one request are processed concurrently, bounded so
+# a large batch does not monopolize the database pool and media workers
+MAX_BATCH_FILES = 50
+UPLOAD_BATCH_CONCURRENCY = int(os.environ.get('UPLOAD_BATCH_CONCURRENCY', '4'))
+
+# Resumable uploads (tus-like): larger files are sent in pieces that survive
+# dropped connections; sessions not finished in time are cleaned up
+RESUMABLE_MAX_FILE_SIZE = int(os.environ.get('RESUMABLE_MAX_FILE_SIZE', str(500 * 1024 * 1024)))  # 500MB
+UPLOAD_SESSION_TTL_SECONDS = 24 * 60 * 60
+UPLOAD_LOCK_SECONDS = 5 * 60  # A PATCH holding a session longer is considered dead
+UPLOAD_CLEANUP_INTERVAL_SECONDS = 60 * 60
+# Uploaded files not attached to a saved entry within this time are deleted
+UNATTACHED_FILE_TTL_SECONDS = 24 * 60 * 60
+upload_cleaner = None
+
+# Media processing: image work runs in a bounded process pool, further
+# tasks are rejected with 503 once MEDIA_QUEUE_LIMIT tasks are in flight
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', str(min(4, os.cpu_count() or 1))))
+MEDIA_QUEUE_LIMIT = int(os.environ.get('MEDIA_QUEUE_LIMIT', str(MEDIA_WORKERS * 4)))
+MEDIA_RETRY_AFTER_SECONDS = 5
+media_pool = MediaPool(MEDIA_WORKERS, MEDIA_QUEUE_LIMIT)
+
+# Image derivatives (resized/transcoded on demand, cached on disk by content hash)
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))  # 512MB
+MAX_DERIVATIVE_SIZE = 2048
+# Requested dimensions are rounded up to one of these, so a client cannot force
+# a new render (and cache file) for every possible width and height
+DERIVATIVE_SIZES = (64, 128, 256, 320, 480, 640, 800, 1024, 1280, 1600, MAX_DERIVATIVE_SIZE)
+# Originals are decoded in full in a worker; larger images are only downloadable
+MAX_DERIVATIVE_SOURCE_BYTES = MAX_FILE_SIZE
+derivative_cache = DerivativeCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+rendering_derivatives = {}
+
+# Text extraction: document attachments are converted to text in the media
+# pool off the request path, stored zlib-compressed once per content (SHA-256)
+# and indexed for search together with the entries that reference them
+TEXT_EXTRACTION_MAX_BYTES = 50 * 1024 * 1024  # Larger documents are skipped
+MAX_EXTRACTED_CHARS = 200_000
+TEXT_COMPRESSION_LEVEL = 6
+text_extraction_queue = None  # Created on startup, inside the event loop
+text_extractor = None
 
 # Admin credentials
 ADMIN_CREDENTIALS = {
@@ -60,16 +185,26 @@ ADMIN_CREDENTIALS = {
 }
 
 # Pydantic models
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a client-supplied datetime to naive UTC like the ones from MongoDB and utcnow()"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class FileAttachment(BaseModel):
     id: Optional[str] = None
     filename: str
     file_type: str
     file_size: int
     content_type: str
-    file_data: str  # Base64 encoded
-    thumbnail: Optional[str] = None  # Base64 encoded thumbnail for images
+    file_data: Optional[str] = None  # Legacy: Base64 encoded, bytes now live in the blob store
+    sha256: Optional[str] = None  # Content hash of the stored blob
+    thumbnail: Optional[str] = None  # Base64 encoded thumbnail for images, only in upload responses
+    thumbnail_url: Optional[str] = None
     uploaded_at: Optional[datetime] = None
 
+    _naive_uploaded_at = field_validator("uploaded_at")(naive_utc)
+
 class KnowledgeEntry(BaseModel):
     id: Optional[str] = None
     question: str
@@ -80,6 +215,30 @@ class KnowledgeEntry(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+    # Aware and naive datetimes cannot be compared, e.g. when the search index sorts by creation time
+    _naive_timestamps = field_validator("created_at", "updated_at")(naive_utc)
+
+class AttachmentSummary(BaseModel):
+    id: Optional[str] = None
+    filename: Optional[str] = None
+    file_type: Optional[str] = None
+    file_size: Optional[int] = None
+    content_type: Optional[str] = None
+    sha256: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    uploaded_at: Optional[datetime] = None
+
+class KnowledgeEntrySummary(BaseModel):
+    """Entry as returned by list and search endpoints: attachment metadata only, all fields optional for sparse fieldsets"""
+    id: Optional[str] = None
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    attachments: Optional[List[AttachmentSummary]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class Category(BaseModel):
     id: Optional[str] = None
     name: str
@@ -88,6 +247,24 @@ class Category(BaseModel):
     description: Optional[str] = None
     created_at: Optional[datetime] = None
 
+    _naive_created_at = field_validator("created_at")(naive_utc)
+
+class UploadResult(BaseModel):
+    index: int
+    filename: str
+    status: str  # "uploaded" or "error"
+    file: Optional[FileAttachment] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    uploaded: int
+    failed: int
+    results: List[UploadResult]
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    length: int
+
 class SearchQuery(BaseModel):
     query: str
     category: Optional[str] = None
@@ -112,20 +289,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # Sub-second issue time, so revoking a user's tokens never hits a login right after it
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    digest = token_digest(token)
+    await token_cache.refresh()
+    username = token_cache.get(digest)
+    if username:
         return username
+    
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    
+    username: str = payload["sub"]
+    # Tokens issued before revocation support carry no issue time
+    issued_at = float(payload.get("iat", 0))
+    if token_cache.is_revoked(digest, username, issued_at):
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    token_cache.put(digest, username, float(payload["exp"]), issued_at)
+    return username
+
+async def revoke_tokens_on_password_change():
+    """Revoke all tokens of users whose password changed since the last start"""
+    for username, password in ADMIN_CREDENTIALS.items():
+        fingerprint = hmac.new(SECRET_KEY.encode(), f"{username}:{password}".encode(), hashlib.sha256).hexdigest()
+        state = await token_revocations_collection.find_one_and_replace(
+            {"_id": f"credentials:{username}"},
+            {"type": "credentials", "fingerprint": fingerprint},
+            upsert=True
+        )
+        if state and state["fingerprint"] != fingerprint:
+            await token_cache.revoke_user(username, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+            print(f"Passwort von {username} geändert, bestehende Anmeldungen widerrufen")
 
 # File handling functions
 def get_file_type(filename: str) -> str:
@@ -138,32 +339,52 @@ def get_file_type(filename: str) -> str:
     
     return 'other'
 
-def create_thumbnail(image_data: bytes, max_size: tuple = (200, 200)) -> str:
-    """Create thumbnail for image files"""
+async def run_media_task(func, *args):
+    """Run CPU-heavy media work in the process pool, or fail with 503 when it is saturated"""
     try:
-        image = Image.open(io.BytesIO(image_data))
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Convert to RGB if necessary
-        if image.mode in ('RGBA', 'LA', 'P'):
-            image = image.convert('RGB')
-        
-        # Save as JPEG
-        thumb_io = io.BytesIO()
-        image.save(thumb_io, format='JPEG', quality=85)
-        thumb_io.seek(0)
-        
-        return base64.b64encode(thumb_io.getvalue()).decode('utf-8')
+        return await media_pool.run(func, *args)
+    except MediaPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Server ausgelastet, bitte später erneut versuchen",
+            headers={"Retry-After": str(MEDIA_RETRY_AFTER_SECONDS)}
+        )
+
+def content_type_matches(content_type: str, file_type: str) -> bool:
+    """Check whether a MIME type belongs to the file class of an extension"""
+    if file_type in MEDIA_MAJOR_TYPES:
+        return content_type.startswith(MEDIA_MAJOR_TYPES[file_type])
+    extensions = {extension.lstrip('.') for extension in mimetypes.guess_all_extensions(content_type)}
+    return bool(extensions & set(ALLOWED_EXTENSIONS.get(file_type, [])))
+
+def sniff_content_type(head: bytes, filename: str, declared_type: Optional[str] = None) -> str:
+    """Detect the MIME type from the first bytes of a file
+
+    The sniffed type is only used if it fits the file class of the extension
+    (libmagic reports e.g. some short text files as images); otherwise the
+    type is derived from the extension.
+    """
+    try:
+        sniffed_type = magic.from_buffer(head, mime=True)
     except Exception as e:
-        print(f"Error creating thumbnail: {e}")
-        return None
+        print(f"Error detecting content type: {e}")
+        sniffed_type = None
+
+    if (sniffed_type and sniffed_type not in GENERIC_CONTENT_TYPES
+            and content_type_matches(sniffed_type, get_file_type(filename))):
+        return sniffed_type
+    return mimetypes.guess_type(filename)[0] or declared_type or sniffed_type or "application/octet-stream"
 
 def validate_file(file: UploadFile) -> bool:
     """Validate uploaded file"""
-    if file.size > MAX_FILE_SIZE:
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=413, detail="Datei zu groß (max. 10MB)")
     
-    extension = file.filename.lower().split('.')[-1]
+    return validate_filename(file.filename)
+
+def validate_filename(filename: str) -> bool:
+    """Validate the extension of an uploaded file name"""
+    extension = filename.lower().split('.')[-1]
     all_allowed = [ext for extensions in ALLOWED_EXTENSIONS.values() for ext in extensions]
     
     if extension not in all_allowed:
@@ -171,10 +392,1270 @@ def validate_file(file: UploadFile) -> bool:
     
     return True
 
+# Blob store functions
+# Attachment bytes live outside the knowledge entries, GridFS-style, and are
+# content-addressed: every distinct content (by SHA-256) is stored once as a blob
+# document in blobs_collection with fixed-size binary chunks in
+# file_chunks_collection. Each uploaded attachment gets its own metadata document
+# in files_collection pointing at the blob; the blob's refcount is the number of
+# such file documents. Entries only keep the attachment metadata.
+async def write_blob_chunks(blob_id: str, data: bytes):
+    """Write file content as fixed-size chunks of a (not yet committed) blob"""
+    for n, offset in enumerate(range(0, len(data), BLOB_CHUNK_SIZE)):
+        await file_chunks_collection.insert_one({
+            "files_id": blob_id,
+            "n": n,
+            "data": Binary(data[offset:offset + BLOB_CHUNK_SIZE])
+        })
+
+async def commit_blob(staged: dict, thumbnail: Optional[str] = None) -> dict:
+    """Turn staged chunks into a blob, or reuse an existing blob with the same content
+
+    When the content is already known the staged chunks are dropped and the
+    existing blob's refcount is incremented instead.
+    """
+    existing = await blobs_collection.find_one_and_update(
+        {"sha256": staged["sha256"]},
+        {"$inc": {"refcount": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not existing:
+        blob = {
+            "id": staged["blob_id"],
+            "sha256": staged["sha256"],
+            "length": staged["length"],
+            "chunk_size": BLOB_CHUNK_SIZE,
+            "content_type": staged["content_type"],
+            "thumbnail": thumbnail,
+            "refcount": 1,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            await blobs_collection.insert_one(blob)
+            return blob
+        except DuplicateKeyError:
+            # Same content committed concurrently by another upload
+            existing = await blobs_collection.find_one_and_update(
+                {"sha256": staged["sha256"]},
+                {"$inc": {"refcount": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+
+    await file_chunks_collection.delete_many({"files_id": staged["blob_id"]})
+    return existing
+
+async def acquire_blob(sha256: str) -> Optional[dict]:
+    """Take another reference on an existing blob"""
+    return await blobs_collection.find_one_and_update(
+        {"sha256": sha256},
+        {"$inc": {"refcount": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def release_blob(blob_id: str):
+    """Drop one reference to a blob and delete its chunks when it is unused"""
+    await blobs_collection.update_one({"id": blob_id}, {"$inc": {"refcount": -1}})
+    blob = await blobs_collection.find_one_and_delete({"id": blob_id, "refcount": {"$lte": 0}})
+    if blob:
+        await file_chunks_collection.delete_many({"files_id": blob_id})
+        await attachment_texts_collection.delete_one({"sha256": blob["sha256"]})
+
+async def register_file(file_id: str, filename: str, blob: dict, attached: bool = False) -> dict:
+    """Register an attachment file that references a committed blob
+
+    Until an entry referencing it is saved, the file carries an expires_at
+    and is deleted by the upload cleanup once that has passed.
+    """
+    now = datetime.utcnow()
+    file_doc = {
+        "id": file_id,
+        "filename": filename,
+        "content_type": blob["content_type"],
+        "length": blob["length"],
+        "chunk_size": blob["chunk_size"],
+        "sha256": blob["sha256"],
+        "blob_id": blob["id"],
+        "uploaded_at": now,
+        "expires_at": None if attached else now + timedelta(seconds=UNATTACHED_FILE_TTL_SECONDS)
+    }
+    await files_collection.insert_one(file_doc)
+    await queue_text_extraction(blob)
+    return file_doc
+
+async def store_blob(file_id: str, filename: str, content_type: str, data: bytes, thumbnail: Optional[str] = None) -> dict:
+    """Store in-memory file content and register it as an attachment file"""
+    staged = {
+        "blob_id": str(uuid.uuid4()),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "length": len(data),
+        "content_type": content_type
+    }
+    blob = await acquire_blob(staged["sha256"])
+    if not blob:
+        await write_blob_chunks(staged["blob_id"], data)
+        blob = await commit_blob(staged, thumbnail)
+    return await register_file(file_id, filename, blob, attached=True)
+
+async def store_upload_stream(file: UploadFile) -> dict:
+    """Stream an upload into staged blob chunks without holding the whole file in memory
+
+    Size and SHA-256 are computed incrementally and the MIME type is sniffed
+    from the first bytes only. The result must be passed to commit_blob.
+    """
+    blob_id = str(uuid.uuid4())
+    sha256 = hashlib.sha256()
+    length = 0
+    n = 0
+    head = None
+    buffer = bytearray()
+
+    async def flush_chunk(data: bytes):
+        nonlocal n
+        await file_chunks_collection.insert_one({"files_id": blob_id, "n": n, "data": Binary(data)})
+        n += 1
+
+    try:
+        while True:
+            data = await file.read(BLOB_CHUNK_SIZE)
+            if not data:
+                break
+
+            length += len(data)
+            if length > MAX_FILE_SIZE:
+                raise HTTPException(status_code=413, detail="Datei zu groß (max. 10MB)")
+            if head is None:
+                head = bytes(data[:MIME_SNIFF_BYTES])
+            # hashlib releases the GIL on large buffers, so concurrent uploads hash in parallel
+            await asyncio.to_thread(sha256.update, data)
+
+            # Keep chunks at a fixed size so byte ranges map directly onto chunk numbers
+            buffer.extend(data)
+            while len(buffer) >= BLOB_CHUNK_SIZE:
+                await flush_chunk(bytes(buffer[:BLOB_CHUNK_SIZE]))
+                del buffer[:BLOB_CHUNK_SIZE]
+
+        if buffer:
+            await flush_chunk(bytes(buffer))
+    except BaseException:
+        await file_chunks_collection.delete_many({"files_id": blob_id})
+        raise
+
+    return {
+        "blob_id": blob_id,
+        "sha256": sha256.hexdigest(),
+        "length": length,
+        "content_type": sniff_content_type(head or b"", file.filename, file.content_type)
+    }
+
+async def iter_blob_chunks(file_doc: dict, start: int = 0, end: Optional[int] = None):
+    """Yield the stored bytes of a file from start to end (inclusive) chunk by chunk"""
+    if end is None:
+        end = file_doc["length"] - 1
+    chunk_size = file_doc["chunk_size"]
+    first_chunk = start // chunk_size
+    last_chunk = end // chunk_size
+
+    chunks = file_chunks_collection.find(
+        {"files_id": file_doc["blob_id"], "n": {"$gte": first_chunk, "$lte": last_chunk}}
+    ).sort("n", ASCENDING).batch_size(4)
+    async for chunk in chunks:
+        data = bytes(chunk["data"])
+        chunk_start = chunk["n"] * chunk_size
+        yield data[max(start - chunk_start, 0):end - chunk_start + 1]
+
+def parse_range_header(range_header: str, length: int) -> Optional[tuple]:
+    """Parse a single 'bytes=' range into an inclusive (start, end) tuple
+
+    Returns None when the header should be ignored and the full file served.
+    Raises HTTP 416 when the range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else length - 1
+        else:
+            # Suffix range: the last N bytes, "-0" selects none
+            suffix = int(end_text)
+            if suffix < 0:
+                raise ValueError
+            start = max(length - suffix, 0) if suffix else length
+            end = length - 1
+    except ValueError:
+        return None
+
+    # Checked first: "bytes=<length>-" (resuming a complete download) also has start > end
+    if start >= length:
+        raise HTTPException(
+            status_code=416,
+            detail="Angeforderter Bereich nicht verfügbar",
+            headers={"Content-Range": f"bytes */{length}"}
+        )
+    if start > end:
+        return None
+    return start, min(end, length - 1)
+
+async def delete_file(file_id: str):
+    """Remove an attachment file and release its blob"""
+    file_doc = await files_collection.find_one_and_delete({"id": file_id})
+    if file_doc:
+        await release_blob(file_doc["blob_id"])
+
+async def attach_files(file_ids: List[str]):
+    """Mark uploaded files as used by a saved entry so the cleanup keeps them"""
+    if file_ids:
+        await files_collection.update_many(
+            {"id": {"$in": file_ids}, "expires_at": {"$ne": None}},
+            {"$set": {"expires_at": None}}
+        )
+
+async def delete_unattached_file(file_id: str, query: Optional[dict] = None) -> bool:
+    """Delete an uploaded file that no saved entry references"""
+    file_doc = await files_collection.find_one_and_delete({"id": file_id, "expires_at": {"$ne": None}, **(query or {})})
+    if not file_doc:
+        return False
+    await release_blob(file_doc["blob_id"])
+    return True
+
+async def externalize_attachments(attachments: List[FileAttachment]):
+    """Move inline base64 attachment data and thumbnails into the blob store
+
+    Also marks the referenced uploads as attached.
+    """
+    for attachment in attachments:
+        if not attachment.id:
+            attachment.id = str(uuid.uuid4())
+        if attachment.file_data:
+            file_doc = await files_collection.find_one({"id": attachment.id}, {"sha256": 1})
+            if not file_doc:
+                file_doc = await store_blob(
+                    attachment.id,
+                    attachment.filename,
+                    attachment.content_type,
+                    base64.b64decode(attachment.file_data),
+                    attachment.thumbnail
+                )
+            attachment.sha256 = file_doc["sha256"]
+            attachment.file_data = None
+        if attachment.thumbnail:
+            if attachment.sha256:
+                await blobs_collection.update_one(
+                    {"sha256": attachment.sha256, "thumbnail": None},
+                    {"$set": {"thumbnail": attachment.thumbnail}}
+                )
+            attachment.thumbnail_url = thumbnail_url(attachment.id)
+    await attach_files([attachment.id for attachment in attachments])
+
+async def render_and_cache_derivative(file_doc: dict, key: str, width: Optional[int], height: Optional[int], fmt: str) -> bytes:
+    """Render a derivative from the original in the media pool and cache it on disk"""
+    original = b"".join([chunk async for chunk in iter_blob_chunks(file_doc)])
+    data = await run_media_task(render_derivative, original, width, height, fmt)
+    if data is None:
+        raise HTTPException(status_code=400, detail="Bild konnte nicht verarbeitet werden")
+    
+    await asyncio.to_thread(derivative_cache.write, key, data)
+    return data
+
+def snap_derivative_size(dimension: Optional[int]) -> Optional[int]:
+    """Round a requested dimension up to the next supported derivative size"""
+    if dimension is None:
+        return None
+    return next(size for size in DERIVATIVE_SIZES if size >= dimension)
+
+def derivative_key(file_doc: dict, width: Optional[int], height: Optional[int], fmt: str) -> str:
+    """Cache key (and ETag) of a derivative: content hash plus rendering parameters"""
+    return f"{file_doc['sha256']}-{width or 0}x{height or 0}.{fmt}"
+
+async def get_derivative(file_doc: dict, width: Optional[int], height: Optional[int], fmt: str) -> bytes:
+    """Return a derivative, rendering it at most once concurrently"""
+    key = derivative_key(file_doc, width, height, fmt)
+    data = await asyncio.to_thread(derivative_cache.read, key)
+    if data is not None:
+        return data
+    
+    task = rendering_derivatives.get(key)
+    if task is None:
+        task = asyncio.ensure_future(render_and_cache_derivative(file_doc, key, width, height, fmt))
+        rendering_derivatives[key] = task
+        task.add_done_callback(lambda _: rendering_derivatives.pop(key, None))
+    # Shielded so one client disconnecting does not cancel the render for the others
+    return await asyncio.shield(task)
+
+def thumbnail_url(file_id: str) -> str:
+    """Public URL of the thumbnail of an attachment"""
+    return f"/api/files/{file_id}/thumbnail"
+
+def build_attachment(file_doc: dict, thumbnail: Optional[str] = None) -> FileAttachment:
+    """Create the attachment metadata for a registered file"""
+    return FileAttachment(
+        id=file_doc["id"],
+        filename=file_doc["filename"],
+        file_type=get_file_type(file_doc["filename"]),
+        file_size=file_doc["length"],
+        content_type=file_doc["content_type"],
+        sha256=file_doc["sha256"],
+        thumbnail=thumbnail,
+        thumbnail_url=thumbnail_url(file_doc["id"]) if thumbnail else None,
+        uploaded_at=file_doc["uploaded_at"]
+    )
+
+async def process_upload(file: UploadFile) -> FileAttachment:
+    """Validate, store and register a single uploaded file"""
+    validate_file(file)
+    
+    # Stream file content into staged blob chunks
+    staged = await store_upload_stream(file)
+    
+    # Create thumbnail for images from the spooled upload, unless the content is already known
+    thumbnail = None
+    file_type = get_file_type(file.filename)
+    if file_type == 'images' and not await blobs_collection.find_one({"sha256": staged["sha256"]}, {"_id": 1}):
+        await file.seek(0)
+        try:
+            thumbnail = await run_media_task(create_thumbnail, await file.read())
+        except HTTPException:
+            await file_chunks_collection.delete_many({"files_id": staged["blob_id"]})
+            raise
+    
+    # Store each distinct content only once
+    blob = await commit_blob(staged, thumbnail)
+    file_doc = await register_file(str(uuid.uuid4()), file.filename, blob)
+    
+    # Create file attachment
+    attachment = build_attachment(file_doc, blob.get("thumbnail"))
+    
+    return attachment
+
+def attachment_ids(entry: dict) -> set:
+    """Collect the attachment ids referenced by a stored entry"""
+    return {att.get("id") for att in entry.get("attachments", []) if att.get("id")}
+
+def entry_document(entry: KnowledgeEntry) -> dict:
+    """Build the MongoDB document for an entry without any file bytes"""
+    return entry.dict(exclude={"attachments": {"__all__": {"file_data", "thumbnail"}}})
+
+async def migrate_embedded_attachments():
+    """Move base64 file data and thumbnails of existing entries into the blob store"""
+    migrated = 0
+    legacy_query = {"$or": [
+        {"attachments.file_data": {"$type": "string"}},
+        {"attachments.thumbnail": {"$type": "string"}}
+    ]}
+    async for entry in knowledge_base.find(legacy_query):
+        attachments = [FileAttachment(**att) for att in entry.get("attachments", [])]
+        await externalize_attachments(attachments)
+        await knowledge_base.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"attachments": [att.dict(exclude={"file_data", "thumbnail"}) for att in attachments]}}
+        )
+        migrated += 1
+
+    if migrated:
+        print(f"Dateianhänge von {migrated} Einträgen in den Dateispeicher verschoben")
+
+async def repair_missing_created_at():
+    """Give entries saved without created_at (by older updates) one, so list cursors can point at them"""
+    result = await knowledge_base.update_many(
+        {"created_at": None},
+        [{"$set": {"created_at": {"$ifNull": ["$updated_at", datetime.utcnow()]}}}]
+    )
+    if result.modified_count:
+        print(f"Erstellungsdatum von {result.modified_count} Einträgen ergänzt")
+
+# List projection functions
+# List and search responses carry attachment metadata only; bytes and
+# thumbnails are served by the file endpoints. Clients can ask for a sparse
+# fieldset with ?fields=question,category (the id is always included).
+LIST_FIELDS = ["id", "question", "answer", "category", "tags", "attachments", "created_at", "updated_at"]
+MAX_PAGE_SIZE = 500
+ATTACHMENT_SUMMARY_FIELDS = ["id", "filename", "file_type", "file_size", "content_type", "sha256", "thumbnail_url", "uploaded_at"]
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma separated sparse fieldset"""
+    if not fields:
+        return LIST_FIELDS
+    
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Felder: {', '.join(unknown)}")
+    
+    return ["id"] + [field for field in requested if field != "id"]
+
+def select_fields(entry: dict, fields: List[str]) -> dict:
+    """Drop fields that were only loaded for pagination"""
+    return {field: entry[field] for field in fields if field in entry}
+
+def clamp_page_size(limit: int) -> int:
+    """Keep a requested page size within sensible bounds"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def list_projection(fields: List[str]) -> dict:
+    """MongoDB projection for a fieldset, never loading attachment payloads"""
+    projection = {"_id": 0}
+    for field in fields:
+        if field == "attachments":
+            for attachment_field in ATTACHMENT_SUMMARY_FIELDS:
+                projection[f"attachments.{attachment_field}"] = 1
+        else:
+            projection[field] = 1
+    return projection
+
+# Pagination functions
+# Lists are paged with keyset (cursor) pagination on (created_at, id), backed by
+# a compound index, so deep pages cost the same as the first. Ranked search
+# results are paged on (score, id). The cursor for the next page is returned in
+# the X-Next-Cursor header and is opaque to clients.
+def encode_cursor(values: list) -> str:
+    """Pack cursor values into an opaque URL-safe token"""
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Unpack a cursor token created by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+
+async def page_by_created_at(query: dict, projection: dict, limit: int, cursor: Optional[str], response: Response) -> list:
+    """Load one page of entries, newest first, continuing after the cursor"""
+    if cursor:
+        created_at, entry_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": entry_id}}
+        ]}]}
+    
+    # Fetch one extra entry to know whether another page exists
+    entries = await (
+        knowledge_base.find(query, {**projection, "id": 1, "created_at": 1})
+        .sort([("created_at", -1), ("id", -1)])
+        .limit(limit + 1)
+        .to_list(length=None)
+    )
+    if len(entries) > limit:
+        entries = entries[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([entries[-1]["created_at"], entries[-1]["id"]])
+    return entries
+
+def page_ranked(ranked: List[tuple], limit: int, cursor: Optional[str], response: Response) -> List[str]:
+    """Select one page of ranked search results, continuing after the cursor"""
+    start = 0
+    if cursor:
+        score, entry_id = decode_cursor(cursor, 2)
+        start = next((i + 1 for i, (doc_id, _) in enumerate(ranked) if doc_id == entry_id), None)
+        if start is None:
+            # The entry was removed or rescored since: resume below its old score
+            start = next((i for i, (_, doc_score) in enumerate(ranked) if doc_score < score), len(ranked))
+    
+    page = ranked[start:start + limit]
+    if start + limit < len(ranked):
+        last_id, last_score = page[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last_score, last_id])
+    return [doc_id for doc_id, _ in page]
+
+# Statistics functions
+# Counters are materialized in stats_collection so /api/stats is a single
+# document read: one totals document plus one document per category holding
+# its entry count. Every write adjusts them with atomic $inc updates, which
+# keeps them correct with several workers. They are rebuilt with $group only
+# when they have never been built, by one worker holding a lease.
+STATS_TOTALS_ID = "knowledge"
+STATS_REBUILD_LOCK_ID = "rebuild"
+STATS_REBUILD_LOCK_SECONDS = 5 * 60
+
+def category_stats_id(category: str) -> str:
+    return f"category:{category}"
+
+async def adjust_stats(category_deltas: dict, attachments_delta: int):
+    """Apply entry count changes per category and the attachment count change"""
+    categories_delta = 0
+    for category, delta in category_deltas.items():
+        if not delta:
+            continue
+        counter = await stats_collection.find_one_and_update(
+            {"_id": category_stats_id(category)},
+            {"$inc": {"entries": delta}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        # A category is counted while at least one entry uses it
+        if delta > 0 and counter["entries"] == delta:
+            categories_delta += 1
+        elif delta < 0 and counter["entries"] <= 0:
+            categories_delta -= 1
+            await stats_collection.delete_one({"_id": counter["_id"], "entries": {"$lte": 0}})
+    
+    await stats_collection.update_one(
+        {"_id": STATS_TOTALS_ID},
+        {"$inc": {
+            "total_entries": sum(category_deltas.values()),
+            "total_attachments": attachments_delta,
+            "categories_count": categories_delta
+        }},
+        upsert=True
+    )
+
+async def record_entry_stats(old_entry: Optional[dict], new_entry: Optional[dict]):
+    """Update the counters for an entry that was created, replaced or deleted"""
+    category_deltas = {}
+    attachments_delta = 0
+    if old_entry:
+        category_deltas[old_entry["category"]] = category_deltas.get(old_entry["category"], 0) - 1
+        attachments_delta -= len(old_entry.get("attachments", []))
+    if new_entry:
+        category_deltas[new_entry["category"]] = category_deltas.get(new_entry["category"], 0) + 1
+        attachments_delta += len(new_entry.get("attachments", []))
+    await adjust_stats(category_deltas, attachments_delta)
+
+async def current_stats() -> dict:
+    """Read the materialized counters"""
+    totals = await stats_collection.find_one({"_id": STATS_TOTALS_ID}) or {}
+    
+    return {
+        "total_entries": totals.get("total_entries", 0),
+        "categories_count": totals.get("categories_count", 0),
+        "total_attachments": totals.get("total_attachments", 0)
+    }
+
+async def rebuild_stats():
+    """Recompute all counters from the knowledge base"""
+    groups = await knowledge_base.aggregate([
+        {"$group": {
+            "_id": "$category",
+            "entries": {"$sum": 1},
+            "attachments": {"$sum": {"$size": {"$ifNull": ["$attachments", []]}}}
+        }}
+    ]).to_list(length=None)
+    
+    category_ids = [category_stats_id(group["_id"]) for group in groups]
+    for category_id, group in zip(category_ids, groups):
+        await stats_collection.replace_one({"_id": category_id}, {"entries": group["entries"]}, upsert=True)
+    await stats_collection.delete_many({"_id": {"$regex": "^category:", "$nin": category_ids}})
+    await stats_collection.replace_one(
+        {"_id": STATS_TOTALS_ID},
+        {
+            "total_entries": sum(group["entries"] for group in groups),
+            "total_attachments": sum(group["attachments"] for group in groups),
+            "categories_count": len(groups),
+            "rebuilt_at": datetime.utcnow()
+        },
+        upsert=True
+    )
+
+async def ensure_stats():
+    """Build the counters unless they exist, with a lease so only one worker rebuilds
+
+    Counters created by $inc updates alone (before any rebuild) carry no
+    rebuilt_at and are rebuilt as well.
+    """
+    totals = await stats_collection.find_one({"_id": STATS_TOTALS_ID}, {"rebuilt_at": 1})
+    if totals and totals.get("rebuilt_at"):
+        return
+    
+    now = datetime.utcnow()
+    try:
+        await stats_collection.update_one(
+            {"_id": STATS_REBUILD_LOCK_ID, "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": now + timedelta(seconds=STATS_REBUILD_LOCK_SECONDS)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another worker holds the lease and is rebuilding
+        return
+    try:
+        await rebuild_stats()
+    finally:
+        await stats_collection.delete_one({"_id": STATS_REBUILD_LOCK_ID})
+
+# Response cache functions
+# Public reads are encoded once with orjson straight from the projected MongoDB
+# documents (no model validation) and cached as bytes. They carry a strong
+# ETag computed from those bytes (and the cached headers), so it changes
+# exactly when the response does and a matching If-None-Match is answered
+# with 304 without touching MongoDB.
+def json_response(body: bytes, headers: dict) -> Response:
+    """Response for an already encoded JSON body"""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def compute_etag(body: bytes, headers: dict) -> str:
+    """Strong ETag of a response body and its cached headers"""
+    digest = hashlib.sha256(body)
+    digest.update(orjson.dumps(headers, option=orjson.OPT_SORT_KEYS))
+    return '"' + digest.hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+async def cached_response(key: tuple, compute, response: Response, if_none_match: Optional[str] = None):
+    """Serve a public read from the response cache, computing it on a miss"""
+    cached = await response_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+    else:
+        # Results computed while a write happened are not stored
+        generation = response_cache.generation
+        body = orjson.dumps(await compute())
+        headers = {name: response.headers[name] for name in CACHED_RESPONSE_HEADERS if name in response.headers}
+        headers["ETag"] = compute_etag(body, headers)
+        headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+        response_cache.put(key, (body, headers), generation)
+    
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    return json_response(body, headers)
+
+# Change event functions
+# Clients of GET /api/events receive "knowledge" (op, id and the entry as in
+# list responses), "category" and "stats" events and can keep a local copy
+# up to date instead of polling.
+async def publish_event(event: dict):
+    """Deliver a change event to the SSE clients of all workers"""
+    event = jsonable_encoder(event)
+    if event_broker.shared:
+        await events_collection.insert_one({"event": event, "created_at": datetime.utcnow()})
+    else:
+        event_broker.publish(event)
+
+async def publish_entry_change(op: str, entry_id: str, document: Optional[dict] = None):
+    """Publish a created/updated/deleted entry and the resulting statistics"""
+    event = {"type": "knowledge", "op": op, "id": entry_id}
+    if document:
+        event["entry"] = select_fields(document, LIST_FIELDS)
+    await publish_event(event)
+    await publish_event({"type": "stats", "stats": await current_stats()})
+
+async def publish_category_change(op: str, category_id: str, name: str):
+    await publish_event({"type": "category", "op": op, "id": category_id, "name": name})
+
+async def watch_events():
+    """Forward events written by any worker to the local SSE clients"""
+    resume_token = None
+    while True:
+        try:
+            async with events_collection.watch(
+                [{"$match": {"operationType": "insert"}}], resume_after=resume_token
+            ) as stream:
+                event_broker.shared = True
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event_broker.publish(change["fullDocument"]["event"])
+        except OperationFailure as e:
+            event_broker.shared = False
+            if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                print("Change Streams nicht verfügbar (kein Replica Set), Ereignisse nur innerhalb dieses Prozesses")
+                return
+            print(f"Change Stream unterbrochen: {e}")
+        except PyMongoError as e:
+            event_broker.shared = False
+            print(f"Change Stream unterbrochen: {e}")
+        await asyncio.sleep(EVENT_RECONNECT_SECONDS)
+
+# Resumable upload functions
+# An upload session owns a staged blob id. PATCH requests append bytes at the
+# session offset straight into fixed-size blob chunks (a trailing partial
+# chunk is completed by the next PATCH), so after an interrupted request the
+# client asks for the offset with HEAD and continues from there. Finalizing
+# hashes the chunks and commits them like a regular upload.
+async def find_upload_session(upload_id: str) -> dict:
+    session = await upload_sessions_collection.find_one({"id": upload_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload nicht gefunden")
+    return session
+
+async def lock_upload_session(upload_id: str, offset: int) -> dict:
+    """Claim a session at the expected offset so only one request writes to it"""
+    now = datetime.utcnow()
+    session = await upload_sessions_collection.find_one_and_update(
+        {"id": upload_id, "offset": offset, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]},
+        {"$set": {"locked_until": now + timedelta(seconds=UPLOAD_LOCK_SECONDS)}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        current = await find_upload_session(upload_id)
+        raise HTTPException(
+            status_code=409,
+            detail="Upload-Offset stimmt nicht überein oder Upload läuft bereits",
+            headers={"Upload-Offset": str(current["offset"])}
+        )
+    return session
+
+async def unlock_upload_session(upload_id: str, offset: Optional[int] = None):
+    update = {"locked_until": None, "expires_at": datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)}
+    if offset is not None:
+        update["offset"] = offset
+    await upload_sessions_collection.update_one({"id": upload_id}, {"$set": update})
+
+async def write_upload_chunk(blob_id: str, n: int, data: bytes):
+    await file_chunks_collection.replace_one(
+        {"files_id": blob_id, "n": n},
+        {"files_id": blob_id, "n": n, "data": Binary(data)},
+        upsert=True
+    )
+
+async def append_upload_data(session: dict, stream) -> int:
+    """Append streamed bytes to a locked session and return the new offset
+
+    Whatever arrived is kept even when the request fails midway.
+    """
+    blob_id = session["blob_id"]
+    n = session["offset"] // BLOB_CHUNK_SIZE
+    buffer = bytearray()
+    if session["offset"] % BLOB_CHUNK_SIZE:
+        tail = await file_chunks_collection.find_one({"files_id": blob_id, "n": n})
+        buffer.extend(tail["data"])
+    
+    try:
+        async for data in stream:
+            if n * BLOB_CHUNK_SIZE + len(buffer) + len(data) > session["length"]:
+                raise HTTPException(status_code=413, detail="Mehr Daten als angekündigt")
+            buffer.extend(data)
+            while len(buffer) >= BLOB_CHUNK_SIZE:
+                await write_upload_chunk(blob_id, n, bytes(buffer[:BLOB_CHUNK_SIZE]))
+                del buffer[:BLOB_CHUNK_SIZE]
+                n += 1
+    finally:
+        if buffer:
+            await write_upload_chunk(blob_id, n, bytes(buffer))
+        offset = n * BLOB_CHUNK_SIZE + len(buffer)
+        await unlock_upload_session(session["id"], offset)
+    return offset
+
+async def stage_upload_session(session: dict) -> dict:
+    """Hash the chunks of a complete session into a staged blob for commit_blob"""
+    sha256 = hashlib.sha256()
+    head = None
+    chunks = file_chunks_collection.find({"files_id": session["blob_id"]}).sort("n", ASCENDING).batch_size(4)
+    async for chunk in chunks:
+        data = bytes(chunk["data"])
+        if head is None:
+            head = data[:MIME_SNIFF_BYTES]
+        # Hashing up to RESUMABLE_MAX_FILE_SIZE must not block the event loop
+        await asyncio.to_thread(sha256.update, data)
+    
+    return {
+        "blob_id": session["blob_id"],
+        "sha256": sha256.hexdigest(),
+        "length": session["length"],
+        "content_type": sniff_content_type(head or b"", session["filename"])
+    }
+
+async def remove_upload_session(upload_id: str, query: Optional[dict] = None) -> bool:
+    """Delete a session and its staged chunks"""
+    session = await upload_sessions_collection.find_one_and_delete({"id": upload_id, **(query or {})})
+    if not session:
+        return False
+    await file_chunks_collection.delete_many({"files_id": session["blob_id"]})
+    return True
+
+async def cleanup_upload_sessions():
+    """Periodically drop upload sessions and uploaded files that were abandoned"""
+    while True:
+        try:
+            now = datetime.utcnow()
+            removed = 0
+            async for session in upload_sessions_collection.find({"expires_at": {"$lt": now}}, {"id": 1}):
+                if await remove_upload_session(session["id"], {"expires_at": {"$lt": now}}):
+                    removed += 1
+            async for file_doc in files_collection.find({"expires_at": {"$lt": now}}, {"id": 1}):
+                if await delete_unattached_file(file_doc["id"], {"expires_at": {"$lt": now}}):
+                    removed += 1
+            if removed:
+                print(f"{removed} abgebrochene Uploads entfernt")
+        except PyMongoError as e:
+            print(f"Fehler beim Aufräumen abgebrochener Uploads: {e}")
+        await asyncio.sleep(UPLOAD_CLEANUP_INTERVAL_SECONDS)
+
+# Attachment text functions
+async def queue_text_extraction(blob: dict):
+    """Schedule text extraction for a blob whose content was not seen before"""
+    if blob["content_type"] not in TEXT_EXTRACTION_TYPES:
+        return
+    result = await attachment_texts_collection.update_one(
+        {"sha256": blob["sha256"]},
+        {"$setOnInsert": {"sha256": blob["sha256"], "status": "pending", "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+    if result.upserted_id is not None and text_extraction_queue is not None:
+        text_extraction_queue.put_nowait(blob["sha256"])
+
+async def queue_missing_text_extractions():
+    """Queue blobs without extracted text, e.g. pending work from before a restart"""
+    finished = set(await attachment_texts_collection.distinct("sha256", {"status": {"$ne": "pending"}}))
+    blobs = blobs_collection.find({"content_type": {"$in": list(TEXT_EXTRACTION_TYPES)}}, {"_id": 0, "sha256": 1})
+    async for blob in blobs:
+        if blob["sha256"] not in finished:
+            text_extraction_queue.put_nowait(blob["sha256"])
+
+async def with_attachment_texts(entries: List[dict]) -> List[dict]:
+    """Add the extracted text of their attachments to entry documents for indexing"""
+    hashes = {attachment.get("sha256") for entry in entries for attachment in entry.get("attachments") or []}
+    hashes.discard(None)
+    if not hashes:
+        return entries
+    
+    texts = {}
+    records = attachment_texts_collection.find(
+        {"sha256": {"$in": list(hashes)}, "status": "done"},
+        {"_id": 0, "sha256": 1, "text": 1}
+    )
+    async for record in records:
+        texts[record["sha256"]] = zlib.decompress(record["text"]).decode("utf-8")
+    
+    return [
+        {**entry, "attachment_text": "\n".join(
+            texts[attachment["sha256"]] for attachment in entry.get("attachments") or []
+            if attachment.get("sha256") in texts
+        )}
+        for entry in entries
+    ]
+
+async def extract_attachment_text(sha256: str):
+    """Extract, store and index the text of one document blob"""
+    record = await attachment_texts_collection.find_one({"sha256": sha256}, {"status": 1})
+    if record and record["status"] != "pending":
+        return
+    blob = await blobs_collection.find_one({"sha256": sha256})
+    if not blob:
+        await attachment_texts_collection.delete_one({"sha256": sha256})
+        return
+    
+    kind = TEXT_EXTRACTION_TYPES.get(blob["content_type"])
+    if not kind or blob["length"] > TEXT_EXTRACTION_MAX_BYTES:
+        await attachment_texts_collection.update_one({"sha256": sha256}, {"$set": {"status": "skipped"}}, upsert=True)
+        return
+    
+    data = b"".join([chunk async for chunk in iter_blob_chunks({**blob, "blob_id": blob["id"]})])
+    while True:
+        try:
+            text = await media_pool.run(extract_text, data, kind, MAX_EXTRACTED_CHARS)
+            break
+        except MediaPoolBusy:
+            # Background work yields to uploads instead of failing
+            await asyncio.sleep(MEDIA_RETRY_AFTER_SECONDS)
+    
+    update = {"status": "failed", "extracted_at": datetime.utcnow()}
+    if text is not None:
+        update.update({
+            "status": "done",
+            "text": Binary(zlib.compress(text.encode("utf-8"), TEXT_COMPRESSION_LEVEL)),
+            "chars": len(text)
+        })
+    await attachment_texts_collection.update_one({"sha256": sha256}, {"$set": update}, upsert=True)
+    
+    if text:
+        # Re-index entries that already reference this content
+        entries = await knowledge_base.find({"attachments.sha256": sha256}, SEARCH_INDEX_PROJECTION).to_list(length=None)
+        for entry in await with_attachment_texts(entries):
+            search_index.add(entry)
+
+async def run_text_extraction():
+    """Work through the text extraction queue one document at a time"""
+    while True:
+        sha256 = await text_extraction_queue.get()
+        try:
+            await extract_attachment_text(sha256)
+        except Exception as e:
+            # Keep the worker alive; the record stays pending and is retried after a restart
+            print(f"Fehler bei der Textextraktion für {sha256}: {e}")
+        finally:
+            text_extraction_queue.task_done()
+
+# Export functions
+# The export is one JSON record per line: an "export" header, then every entry
+# as an "entry" record. With attachments, each entry is followed by a "file"
+# record per attachment and the content of every distinct blob as "chunk"
+# records (base64, in chunk order) the first time it is referenced. Entries
+# are read from a server-side cursor and records are streamed in blocks, so
+# memory use does not grow with the size of the wiki.
+async def export_attachment_records(entry: dict, exported_blobs: set):
+    """Yield the file and chunk records of an entry's attachments"""
+    for attachment in entry.get("attachments", []):
+        file_doc = await files_collection.find_one({"id": attachment.get("id")}, {"_id": 0})
+        if not file_doc:
+            continue
+        yield {
+            "type": "file",
+            "id": file_doc["id"],
+            "entry_id": entry["id"],
+            "filename": file_doc["filename"],
+            "content_type": file_doc["content_type"],
+            "length": file_doc["length"],
+            "sha256": file_doc["sha256"]
+        }
+        
+        if file_doc["sha256"] in exported_blobs:
+            continue
+        exported_blobs.add(file_doc["sha256"])
+        chunks = file_chunks_collection.find({"files_id": file_doc["blob_id"]}).sort("n", ASCENDING).batch_size(4)
+        async for chunk in chunks:
+            yield {
+                "type": "chunk",
+                "sha256": file_doc["sha256"],
+                "n": chunk["n"],
+                "data": base64.b64encode(chunk["data"]).decode("ascii")
+            }
+
+async def export_records(include_attachments: bool):
+    """Yield all export records in creation order"""
+    yield {
+        "type": "export",
+        "version": EXPORT_FORMAT_VERSION,
+        "exported_at": datetime.utcnow(),
+        "attachments": include_attachments
+    }
+    
+    exported_blobs = set()
+    entries = knowledge_base.find({}, {"_id": 0}).sort([("created_at", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    async for entry in entries:
+        yield {"type": "entry", "entry": entry}
+        if include_attachments:
+            async for record in export_attachment_records(entry, exported_blobs):
+                yield record
+
+async def encode_ndjson(records):
+    """Encode records as NDJSON, grouped into blocks of about EXPORT_FLUSH_BYTES"""
+    block = bytearray()
+    async for record in records:
+        block += orjson.dumps(record)
+        block += b"\n"
+        if len(block) >= EXPORT_FLUSH_BYTES:
+            yield bytes(block)
+            block.clear()
+    if block:
+        yield bytes(block)
+
+async def gzip_stream(blocks):
+    """Compress a byte stream on the fly into a single gzip member"""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+# Bulk import functions
+# Records are validated one by one as the body streams in and written in
+# unordered insert_many batches; a failing record (e.g. a duplicate id) does
+# not stop the rest of its batch. The search index, statistics, response
+# cache and SSE clients are updated once per batch or import. Besides plain
+# entries the importer accepts the records of /api/export.ndjson, so a
+# backup can be restored including its attachments.
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors())
+
+async def prepare_bulk_entry(record, seen_ids: set) -> tuple:
+    """Validate an imported record and build its document
+
+    Returns the document and the ids of files stored from inline data for
+    it, which must be deleted again if the entry cannot be inserted.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Eintrag muss ein JSON-Objekt sein")
+    entry = KnowledgeEntry(**record)
+    
+    now = datetime.utcnow()
+    entry.id = entry.id or str(uuid.uuid4())
+    entry.created_at = entry.created_at or now
+    entry.updated_at = entry.updated_at or now
+    for attachment in entry.attachments:
+        if not attachment.uploaded_at:
+            attachment.uploaded_at = now
+    
+    if entry.id in seen_ids:
+        raise ValueError("Eintrag mit dieser ID kommt im Import mehrfach vor")
+    seen_ids.add(entry.id)
+    
+    stored_file_ids = []
+    if any(attachment.file_data or attachment.thumbnail for attachment in entry.attachments):
+        # Don't store inline file data for an entry that cannot be inserted
+        if await knowledge_base.find_one({"id": entry.id}, {"_id": 1}):
+            raise ValueError("Eintrag mit dieser ID existiert bereits")
+        inline = [attachment for attachment in entry.attachments if attachment.file_data]
+        inline_ids = [attachment.id for attachment in inline if attachment.id]
+        existing_ids = {file_doc["id"] async for file_doc in files_collection.find({"id": {"$in": inline_ids}}, {"id": 1})}
+        await externalize_attachments(entry.attachments)
+        stored_file_ids = [attachment.id for attachment in inline if attachment.id not in existing_ids]
+    return entry_document(entry), stored_file_ids
+
+async def insert_bulk_batch(batch: List[tuple]) -> List[dict]:
+    """Insert (index, document, stored_file_ids) tuples unordered and report the outcome of each"""
+    errors = {}
+    try:
+        await knowledge_base.insert_many([document for _, document, _ in batch], ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details["writeErrors"]:
+            errors[write_error["index"]] = (
+                "Eintrag mit dieser ID existiert bereits" if write_error["code"] == 11000 else write_error["errmsg"]
+            )
+    
+    results = []
+    inserted = []
+    for position, (index, document, stored_file_ids) in enumerate(batch):
+        if position in errors:
+            results.append({"index": index, "id": document["id"], "status": "error", "error": errors[position]})
+            for file_id in stored_file_ids:
+                await delete_file(file_id)
+        else:
+            results.append({"index": index, "id": document["id"], "status": "created"})
+            inserted.append(document)
+    
+    if inserted:
+        search_index.add_many(await with_attachment_texts(inserted))
+        category_deltas = {}
+        for document in inserted:
+            category_deltas[document["category"]] = category_deltas.get(document["category"], 0) + 1
+        await adjust_stats(category_deltas, sum(len(document["attachments"]) for document in inserted))
+    return results
+
+class ExportedFileRestore:
+    """Restore attachment files from the "file" and "chunk" records of an export
+
+    The chunks of a content follow the first file record using it. They are
+    staged and committed as a blob once the next non-chunk record arrives,
+    after checking length and SHA-256. Restored file ids are added to the
+    stored files of their entry, so they are deleted again if the entry
+    cannot be inserted. Files that cannot be restored are collected in
+    failed as (index, entry_id, error).
+    """
+
+    def __init__(self):
+        self.pending: Optional[dict] = None
+        self.failed: List[tuple] = []
+
+    def fail(self, index: int, record: dict, error: str):
+        self.failed.append((index, record.get("entry_id"), error))
+
+    async def add_file(self, index: int, record: dict, stored_file_ids: Optional[list]):
+        await self.finish()
+        fields = ("id", "filename", "content_type", "sha256")
+        if not all(isinstance(record.get(field), str) for field in fields) or not isinstance(record.get("length"), int):
+            return self.fail(index, record, "Ungültiger Dateieintrag")
+        if get_file_type(record["filename"]) == 'other':
+            return self.fail(index, record, "Dateityp nicht unterstützt")
+        if stored_file_ids is None:
+            return self.fail(index, record, "Dateianhang ohne importierten Eintrag")
+        
+        # Chunks that follow are not needed if the file or its content already exist
+        self.pending = {"index": index, "file": record, "skip": True}
+        if await files_collection.find_one({"id": record["id"]}, {"_id": 1}):
+            # Restoring into the database the export came from
+            return
+        blob = await acquire_blob(record["sha256"])
+        if blob:
+            await register_file(record["id"], record["filename"], blob, attached=True)
+            stored_file_ids.append(record["id"])
+            return
+        self.pending.update({
+            "skip": False,
+            "stored_file_ids": stored_file_ids,
+            "blob_id": str(uuid.uuid4()),
+            "hash": hashlib.sha256(),
+            "length": 0,
+            "n": 0,
+            "error": None
+        })
+
+    async def add_chunk(self, record: dict):
+        pending = self.pending
+        if not pending or record.get("sha256") != pending["file"]["sha256"]:
+            raise ValueError("Dateiblock ohne passende Datei")
+        if pending["skip"] or pending["error"]:
+            return
+        try:
+            data = base64.b64decode(record.get("data") or "")
+        except ValueError:
+            pending["error"] = "Ungültiger Dateiblock"
+            return
+        if record.get("n") != pending["n"]:
+            pending["error"] = "Dateiblöcke fehlen oder sind vertauscht"
+        elif len(data) > BLOB_CHUNK_SIZE or pending["length"] != pending["n"] * BLOB_CHUNK_SIZE:
+            # Only the last chunk may be shorter, so byte ranges map onto chunk numbers
+            pending["error"] = "Ungültige Blockgröße"
+        elif pending["length"] + len(data) > pending["file"]["length"]:
+            pending["error"] = "Datei ist größer als angegeben"
+        else:
+            await file_chunks_collection.insert_one({"files_id": pending["blob_id"], "n": pending["n"], "data": Binary(data)})
+            await asyncio.to_thread(pending["hash"].update, data)
+            pending["length"] += len(data)
+            pending["n"] += 1
+
+    async def finish(self):
+        """Commit the staged chunks of the current file"""
+        pending, self.pending = self.pending, None
+        if not pending or pending["skip"]:
+            return
+        file_record = pending["file"]
+        error = pending["error"]
+        if not error and (pending["hash"].hexdigest() != file_record["sha256"] or pending["length"] != file_record["length"]):
+            error = "Datei ist unvollständig oder beschädigt"
+        if error:
+            await file_chunks_collection.delete_many({"files_id": pending["blob_id"]})
+            return self.fail(pending["index"], file_record, f"{file_record['filename']}: {error}")
+        
+        staged = {
+            "blob_id": pending["blob_id"],
+            "sha256": file_record["sha256"],
+            "length": pending["length"],
+            "content_type": file_record["content_type"]
+        }
+        thumbnail = None
+        if get_file_type(file_record["filename"]) == 'images' and pending["length"] <= MAX_FILE_SIZE:
+            original = b"".join([chunk async for chunk in iter_blob_chunks({**staged, "chunk_size": BLOB_CHUNK_SIZE})])
+            while True:
+                try:
+                    thumbnail = await media_pool.run(create_thumbnail, original)
+                    break
+                except MediaPoolBusy:
+                    await asyncio.sleep(MEDIA_RETRY_AFTER_SECONDS)
+        blob = await commit_blob(staged, thumbnail)
+        await register_file(file_record["id"], file_record["filename"], blob, attached=True)
+        pending["stored_file_ids"].append(file_record["id"])
+
+async def reject_failed_restores(restore: ExportedFileRestore, batch: List[tuple], batch_files: dict) -> List[dict]:
+    """Report files that could not be restored and take their entries out of the batch"""
+    results = []
+    for index, entry_id, error in restore.failed:
+        results.append({"index": index, "status": "error", "error": error})
+        stored_file_ids = batch_files.pop(entry_id, None)
+        if stored_file_ids is None:
+            continue
+        for position, (entry_index, document, _) in enumerate(batch):
+            if document["id"] == entry_id:
+                del batch[position]
+                results.append({
+                    "index": entry_index,
+                    "id": entry_id,
+                    "status": "error",
+                    "error": "Dateianhang konnte nicht wiederhergestellt werden"
+                })
+                break
+        for file_id in stored_file_ids:
+            await delete_file(file_id)
+    restore.failed = []
+    return results
+
+# Index definitions
+# Every query pattern used by the API is backed by one of these indexes. They
+# are created idempotently at startup, and HOT_QUERIES is checked with
+# explain() afterwards so a query that would scan a collection or sort in
+# memory stops the server instead of silently getting slow.
+INDEXES = [
+    (knowledge_base, [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("attachments.sha256", ASCENDING)]),
+    ]),
+    (categories_collection, [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING)], unique=True),
+    ]),
+    (files_collection, [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)]),
+    ]),
+    (file_chunks_collection, [
+        IndexModel([("files_id", ASCENDING), ("n", ASCENDING)], unique=True),
+    ]),
+    (blobs_collection, [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("sha256", ASCENDING)], unique=True),
+    ]),
+    (attachment_texts_collection, [
+        IndexModel([("sha256", ASCENDING)], unique=True),
+    ]),
+    (upload_sessions_collection, [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)]),
+    ]),
+    (token_revocations_collection, [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ]),
+    (events_collection, [
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=EVENT_RETENTION_SECONDS),
+    ]),
+]
+
+# (collection, filter, sort) of the queries that run on every request
+HOT_QUERIES = [
+    (knowledge_base, {"id": ""}, None),
+    (knowledge_base, {"id": {"$in": [""]}}, None),
+    (knowledge_base, {}, [("created_at", -1), ("id", -1)]),
+    (knowledge_base, {"category": ""}, [("created_at", -1), ("id", -1)]),
+    (knowledge_base, {"attachments.sha256": ""}, None),
+    (categories_collection, {"id": ""}, None),
+    (categories_collection, {"name": ""}, None),
+    (files_collection, {"id": ""}, None),
+    (files_collection, {"expires_at": {"$lt": ""}}, None),
+    (file_chunks_collection, {"files_id": "", "n": {"$gte": 0, "$lte": 1}}, [("n", ASCENDING)]),
+    (blobs_collection, {"id": ""}, None),
+    (blobs_collection, {"sha256": ""}, None),
+    (upload_sessions_collection, {"id": ""}, None),
+    (attachment_texts_collection, {"sha256": {"$in": [""]}}, None),
+]
+UNINDEXED_STAGES = {"COLLSCAN", "SORT"}
+
+async def ensure_indexes():
+    """Create all declared indexes; existing identical indexes are left alone"""
+    for collection, indexes in INDEXES:
+        await collection.create_indexes(indexes)
+
+def plan_stages(plan: dict) -> set:
+    """Collect the stage names of an explain() query plan tree"""
+    stages = {plan.get("stage")}
+    for child in [plan.get("inputStage"), plan.get("queryPlan"), *plan.get("inputStages", [])]:
+        if child:
+            stages |= plan_stages(child)
+    return stages
+
+async def check_query_indexes():
+    """Fail startup when a hot query is not served by an index"""
+    uncovered = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = plan_stages(plan) & UNINDEXED_STAGES
+        if stages:
+            uncovered.append(f"{collection.name} {query} sort={sort}: {', '.join(sorted(stages))}")
+    
+    if uncovered:
+        raise RuntimeError("Abfragen ohne passenden Index:\n" + "\n".join(uncovered))
+
 # API Routes
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "Böttcher Wiki API"}
+    return {
+        "status": "healthy",
+        "service": "Böttcher Wiki API",
+        "media_pool": media_pool.stats(),
+        "response_cache": response_cache.stats(),
+        "events": event_broker.stats(),
+        "tokens": token_cache.stats(),
+        "text_extraction": {"queued": text_extraction_queue.qsize() if text_extraction_queue else 0}
+    }
 
 @app.post("/api/admin/login", response_model=LoginResponse)
 async def admin_login(login_request: LoginRequest):
@@ -188,6 +1669,20 @@ async def admin_login(login_request: LoginRequest):
     access_token = create_access_token(data={"sub": username})
     return LoginResponse(access_token=access_token, username=username)
 
+@app.post("/api/admin/logout")
+async def admin_logout(credentials: HTTPAuthorizationCredentials = Depends(security),
+                       current_user: str = Depends(verify_token)):
+    """Abmelden - Token wird serverseitig ungültig"""
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    await token_cache.revoke_token(token_digest(credentials.credentials), payload["exp"])
+    return {"message": "Abgemeldet"}
+
+@app.post("/api/admin/logout-all")
+async def admin_logout_all(current_user: str = Depends(verify_token)):
+    """Alle Anmeldungen des Benutzers beenden"""
+    await token_cache.revoke_user(current_user, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    return {"message": "Alle Anmeldungen beendet"}
+
 @app.get("/api/admin/verify")
 async def verify_admin(current_user: str = Depends(verify_token)):
     """Token verifizieren"""
@@ -196,60 +1691,237 @@ async def verify_admin(current_user: str = Depends(verify_token)):
 @app.post("/api/upload", response_model=FileAttachment)
 async def upload_file(file: UploadFile = File(...), current_user: str = Depends(verify_token)):
     """Datei hochladen - nur für Admins"""
-    validate_file(file)
+    return await process_upload(file)
+
+@app.post("/api/upload/batch", response_model=BatchUploadResponse)
+async def upload_files(files: List[UploadFile] = File(...), current_user: str = Depends(verify_token)):
+    """Mehrere Dateien in einer Anfrage hochladen - nur für Admins"""
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Zu viele Dateien (max. {MAX_BATCH_FILES})")
     
-    # Read file content
-    file_content = await file.read()
-    file_data = base64.b64encode(file_content).decode('utf-8')
+    slots = asyncio.Semaphore(UPLOAD_BATCH_CONCURRENCY)
     
-    # Create thumbnail for images
-    thumbnail = None
-    file_type = get_file_type(file.filename)
-    if file_type == 'images':
-        thumbnail = create_thumbnail(file_content)
+    async def upload(index: int, file: UploadFile) -> UploadResult:
+        async with slots:
+            try:
+                attachment = await process_upload(file)
+            except HTTPException as e:
+                # One broken file does not fail the others
+                return UploadResult(index=index, filename=file.filename or "", status="error", error=e.detail)
+            return UploadResult(index=index, filename=file.filename or "", status="uploaded", file=attachment)
     
-    # Create file attachment
-    attachment = FileAttachment(
-        id=str(uuid.uuid4()),
-        filename=file.filename,
-        file_type=file_type,
-        file_size=len(file_content),
-        content_type=file.content_type,
-        file_data=file_data,
-        thumbnail=thumbnail,
-        uploaded_at=datetime.utcnow()
-    )
+    results = await asyncio.gather(*(upload(index, file) for index, file in enumerate(files)))
+    uploaded = sum(1 for result in results if result.status == "uploaded")
+    return BatchUploadResponse(uploaded=uploaded, failed=len(results) - uploaded, results=results)
+
+@app.post("/api/uploads", status_code=201)
+async def create_upload(upload: UploadSessionCreate, response: Response, current_user: str = Depends(verify_token)):
+    """Fortsetzbaren Upload anlegen - nur für Admins"""
+    validate_filename(upload.filename)
+    if upload.length <= 0:
+        raise HTTPException(status_code=400, detail="Datei ist leer")
+    if upload.length > RESUMABLE_MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"Datei zu groß (max. {RESUMABLE_MAX_FILE_SIZE // (1024 * 1024)}MB)")
     
-    return attachment
+    now = datetime.utcnow()
+    session = {
+        "id": str(uuid.uuid4()),
+        "blob_id": str(uuid.uuid4()),
+        "filename": upload.filename,
+        "length": upload.length,
+        "offset": 0,
+        "created_by": current_user,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+        "locked_until": None
+    }
+    await upload_sessions_collection.insert_one(session)
+    
+    response.headers["Location"] = f"/api/uploads/{session['id']}"
+    response.headers["Upload-Offset"] = "0"
+    return {
+        "id": session["id"],
+        "offset": 0,
+        "length": upload.length,
+        "chunk_size": BLOB_CHUNK_SIZE,
+        "expires_at": session["expires_at"]
+    }
+
+@app.head("/api/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str, current_user: str = Depends(verify_token)):
+    """Bereits empfangene Bytes eines Uploads abfragen - nur für Admins"""
+    session = await find_upload_session(upload_id)
+    return Response(headers={
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store"
+    })
+
+@app.patch("/api/uploads/{upload_id}", status_code=204)
+async def append_upload(upload_id: str, request: Request, upload_offset: int = Header(..., alias="Upload-Offset"),
+                        current_user: str = Depends(verify_token)):
+    """Daten ab Upload-Offset an einen Upload anhängen - nur für Admins"""
+    session = await lock_upload_session(upload_id, upload_offset)
+    offset = await append_upload_data(session, request.stream())
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+@app.post("/api/uploads/{upload_id}/finalize", response_model=FileAttachment)
+async def finalize_upload(upload_id: str, current_user: str = Depends(verify_token)):
+    """Vollständigen Upload als Datei übernehmen - nur für Admins"""
+    session = await find_upload_session(upload_id)
+    if session["offset"] != session["length"]:
+        raise HTTPException(
+            status_code=409,
+            detail="Upload ist noch nicht vollständig",
+            headers={"Upload-Offset": str(session["offset"])}
+        )
+    session = await lock_upload_session(upload_id, session["length"])
+    
+    try:
+        staged = await stage_upload_session(session)
+        
+        thumbnail = None
+        if (get_file_type(session["filename"]) == 'images' and session["length"] <= MAX_FILE_SIZE
+                and not await blobs_collection.find_one({"sha256": staged["sha256"]}, {"_id": 1})):
+            original = b"".join([chunk async for chunk in iter_blob_chunks({**staged, "chunk_size": BLOB_CHUNK_SIZE})])
+            thumbnail = await run_media_task(create_thumbnail, original)
+    except BaseException:
+        # Keep the session so finalizing can be retried
+        await unlock_upload_session(upload_id)
+        raise
+    
+    # The staged chunks now belong to the blob (or were dropped as a duplicate)
+    await upload_sessions_collection.delete_one({"id": upload_id})
+    blob = await commit_blob(staged, thumbnail)
+    file_doc = await register_file(str(uuid.uuid4()), session["filename"], blob)
+    return build_attachment(file_doc, blob.get("thumbnail"))
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+async def cancel_upload(upload_id: str, current_user: str = Depends(verify_token)):
+    """Upload abbrechen und empfangene Daten verwerfen - nur für Admins"""
+    if not await remove_upload_session(upload_id):
+        raise HTTPException(status_code=404, detail="Upload nicht gefunden")
+    return Response(status_code=204)
+
+@app.delete("/api/files/{file_id}", status_code=204)
+async def discard_file(file_id: str, current_user: str = Depends(verify_token)):
+    """Hochgeladene, noch keinem Eintrag zugeordnete Datei verwerfen - nur für Admins"""
+    if not await delete_unattached_file(file_id):
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden oder bereits einem Eintrag zugeordnet")
+    return Response(status_code=204)
 
 @app.get("/api/files/{file_id}/download")
-async def download_file(file_id: str):
-    """Datei herunterladen"""
-    # Find file in knowledge entries
-    entry = knowledge_base.find_one({"attachments.id": file_id})
-    if not entry:
+async def download_file(file_id: str, range_header: Optional[str] = Header(None, alias="Range"),
+                        if_none_match: Optional[str] = Header(None)):
+    """Datei herunterladen - unterstützt Teil-Downloads (HTTP Range)"""
+    file_doc = await files_collection.find_one({"id": file_id})
+    if not file_doc:
         raise HTTPException(status_code=404, detail="Datei nicht gefunden")
     
-    # Find specific attachment
-    attachment = None
-    for att in entry.get("attachments", []):
-        if att.get("id") == file_id:
-            attachment = att
-            break
+    # The content of a file id never changes, its hash is a strong validator
+    etag = f'"{file_doc["sha256"]}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified({"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
     
-    if not attachment:
-        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+    length = file_doc["length"]
+    headers = {
+        "Content-Disposition": f"attachment; filename={file_doc['filename']}",
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL
+    }
     
-    # Decode file data
-    file_data = base64.b64decode(attachment["file_data"])
+    byte_range = parse_range_header(range_header, length) if range_header and length else None
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            iter_blob_chunks(file_doc, start, end),
+            status_code=206,
+            media_type=file_doc["content_type"],
+            headers=headers
+        )
     
     # Create response
+    headers["Content-Length"] = str(length)
     return StreamingResponse(
-        io.BytesIO(file_data),
-        media_type=attachment["content_type"],
-        headers={"Content-Disposition": f"attachment; filename={attachment['filename']}"}
+        iter_blob_chunks(file_doc),
+        media_type=file_doc["content_type"],
+        headers=headers
+    )
+
+@app.get("/api/files/{file_id}/thumbnail")
+async def get_thumbnail(file_id: str):
+    """Vorschaubild eines Bildanhangs abrufen - öffentlich"""
+    file_doc = await files_collection.find_one({"id": file_id}, {"blob_id": 1})
+    blob = await blobs_collection.find_one({"id": file_doc["blob_id"]}, {"thumbnail": 1}) if file_doc else None
+    if not blob or not blob.get("thumbnail"):
+        raise HTTPException(status_code=404, detail="Vorschaubild nicht gefunden")
+    
+    # Thumbnails never change for a given file id
+    return Response(
+        content=base64.b64decode(blob["thumbnail"]),
+        media_type="image/jpeg",
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
+
+@app.get("/api/files/{file_id}/image")
+async def get_image(file_id: str, w: Optional[int] = None, h: Optional[int] = None, fmt: str = "jpeg",
+                    if_none_match: Optional[str] = Header(None)):
+    """Bildanhang in passender Größe/Format abrufen - öffentlich, lange cachebar"""
+    for dimension in (w, h):
+        if dimension is not None and not 1 <= dimension <= MAX_DERIVATIVE_SIZE:
+            raise HTTPException(status_code=400, detail=f"Ungültige Bildgröße (1-{MAX_DERIVATIVE_SIZE})")
+    w, h = snap_derivative_size(w), snap_derivative_size(h)
+    fmt = fmt.lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in DERIVATIVE_FORMATS:
+        raise HTTPException(status_code=400, detail="Bildformat nicht unterstützt")
+    
+    file_doc = await files_collection.find_one({"id": file_id})
+    if not file_doc:
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+    if not file_doc["content_type"].startswith("image/"):
+        raise HTTPException(status_code=400, detail="Datei ist kein Bild")
+    if file_doc["length"] > MAX_DERIVATIVE_SOURCE_BYTES:
+        raise HTTPException(status_code=400, detail="Bild zu groß für eine Vorschau, bitte herunterladen")
+    
+    etag = f'"{derivative_key(file_doc, w, h, fmt)}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified({"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+    
+    data = await get_derivative(file_doc, w, h, fmt)
+    
+    # Derivatives are keyed by content hash and parameters, so they never change
+    return Response(
+        content=data,
+        media_type=DERIVATIVE_FORMATS[fmt][1],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag}
     )
 
+@app.get("/api/files/hash/{sha256}")
+async def check_file_hash(sha256: str, current_user: str = Depends(verify_token)):
+    """Prüfen ob ein Dateiinhalt bereits gespeichert ist - nur für Admins"""
+    blob = await blobs_collection.find_one({"sha256": sha256.lower()}, {"_id": 0, "length": 1, "content_type": 1})
+    if not blob:
+        return {"sha256": sha256.lower(), "exists": False}
+    
+    return {"sha256": sha256.lower(), "exists": True, "file_size": blob["length"], "content_type": blob["content_type"]}
+
+@app.post("/api/files/hash/{sha256}", response_model=FileAttachment)
+async def attach_existing_file(sha256: str, filename: str = Form(...), current_user: str = Depends(verify_token)):
+    """Bereits gespeicherten Dateiinhalt ohne erneuten Upload anhängen - nur für Admins"""
+    validate_filename(filename)
+    
+    blob = await acquire_blob(sha256.lower())
+    if not blob:
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+    
+    file_doc = await register_file(str(uuid.uuid4()), filename, blob)
+    return build_attachment(file_doc, blob.get("thumbnail"))
+
 @app.post("/api/knowledge", response_model=KnowledgeEntry)
 async def create_knowledge_entry(entry: KnowledgeEntry, current_user: str = Depends(verify_token)):
     """Neue Frage/Antwort hinzufügen - nur für Admins"""
@@ -261,80 +1933,198 @@ async def create_knowledge_entry(entry: KnowledgeEntry, current_user: str = Depe
     for attachment in entry.attachments:
         if not attachment.uploaded_at:
             attachment.uploaded_at = datetime.utcnow()
+    await externalize_attachments(entry.attachments)
     
-    knowledge_base.insert_one(entry.dict())
+    document = entry_document(entry)
+    await knowledge_base.insert_one(document)
+    for indexed in await with_attachment_texts([document]):
+        search_index.add(indexed)
+    await record_entry_stats(None, document)
+    await response_cache.invalidate()
+    await publish_entry_change("created", entry.id, document)
     return entry
 
-@app.get("/api/knowledge", response_model=List[KnowledgeEntry])
-async def get_all_knowledge(category: Optional[str] = None, limit: int = 100):
-    """Alle Wissenseinträge abrufen - öffentlich"""
+@app.post("/api/knowledge/bulk")
+async def bulk_import_knowledge(request: Request, current_user: str = Depends(verify_token)):
+    """Viele Wissenseinträge auf einmal importieren (NDJSON oder JSON-Array) - nur für Admins"""
+    results = []
+    batch = []
+    batch_files = {}  # Entry id -> ids of the files stored for it
+    seen_ids = set()
+    restore = ExportedFileRestore()
+    async for index, record, error in iter_records(request.stream()):
+        record_type = record.get("type") if error is None and isinstance(record, dict) else None
+        if record_type != "chunk":
+            # The pending file is complete once any other record follows
+            await restore.finish()
+            results += await reject_failed_restores(restore, batch, batch_files)
+        if error is None:
+            try:
+                if record_type == "chunk":
+                    await restore.add_chunk(record)
+                elif record_type == "export":
+                    if record.get("version") != EXPORT_FORMAT_VERSION:
+                        raise ValueError(f"Exportformat Version {record.get('version')} wird nicht unterstützt")
+                elif record_type == "file":
+                    await restore.add_file(index, record, batch_files.get(record.get("entry_id")))
+                else:
+                    # Written only now, when the files of all batched entries are restored
+                    if len(batch) >= BULK_BATCH_SIZE:
+                        results += await insert_bulk_batch(batch)
+                        batch = []
+                        batch_files = {}
+                    if record_type == "entry":
+                        record = record.get("entry")
+                    document, stored_file_ids = await prepare_bulk_entry(record, seen_ids)
+                    batch.append((index, document, stored_file_ids))
+                    batch_files[document["id"]] = stored_file_ids
+            except ValidationError as e:
+                error = validation_message(e)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            results.append({"index": index, "status": "error", "error": error})
+    await restore.finish()
+    results += await reject_failed_restores(restore, batch, batch_files)
+    if batch:
+        results += await insert_bulk_batch(batch)
+    
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    if created:
+        await response_cache.invalidate()
+        # Too many changes for single deltas: clients reload everything
+        await publish_event({"type": "reset"})
+    
+    return json_response(
+        orjson.dumps({"created": created, "failed": len(results) - created, "results": results}),
+        {}
+    )
+
+@app.get("/api/knowledge", response_model=List[KnowledgeEntrySummary], response_model_exclude_unset=True)
+async def get_all_knowledge(response: Response, category: Optional[str] = None, limit: int = 100,
+                            cursor: Optional[str] = None, fields: Optional[str] = None,
+                            if_none_match: Optional[str] = Header(None)):
+    """Alle Wissenseinträge abrufen - öffentlich, seitenweise über X-Next-Cursor"""
+    requested_fields = parse_fields(fields)
+    limit = clamp_page_size(limit)
     query = {}
     if category:
         query["category"] = category
     
-    entries = list(knowledge_base.find(query).sort("created_at", -1).limit(limit))
-    result = []
+    async def load_page():
+        entries = await page_by_created_at(query, list_projection(requested_fields), limit, cursor, response)
+        return [select_fields(entry, requested_fields) for entry in entries]
     
-    for entry in entries:
-        entry["_id"] = str(entry["_id"])
-        result.append(KnowledgeEntry(**entry))
-    
-    return result
+    return await cached_response(("knowledge", category, limit, cursor, tuple(requested_fields)), load_page, response, if_none_match)
 
-@app.post("/api/search", response_model=List[KnowledgeEntry])
-async def search_knowledge(search_query: SearchQuery):
-    """Wissensdatenbank durchsuchen - öffentlich"""
-    query = {}
-    
-    if search_query.query:
-        search_pattern = re.compile(search_query.query, re.IGNORECASE)
-        query["$or"] = [
-            {"question": {"$regex": search_pattern}},
-            {"answer": {"$regex": search_pattern}},
-            {"tags": {"$regex": search_pattern}}
-        ]
+@app.post("/api/search", response_model=List[KnowledgeEntrySummary], response_model_exclude_unset=True)
+async def search_knowledge(search_query: SearchQuery, response: Response, limit: int = 100,
+                           cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Wissensdatenbank durchsuchen - öffentlich (fehlertolerant, mit "Meinten Sie"-Vorschlag)"""
+    requested_fields = parse_fields(fields)
+    projection = list_projection(requested_fields)
+    limit = clamp_page_size(limit)
+    if not search_query.query.strip():
+        query = {}
+        if search_query.category:
+            query["category"] = search_query.category
+        entries = await page_by_created_at(query, projection, limit, cursor, response)
+    else:
+        # Rank with the in-memory index, then load only the entries of this page
+        ranked = search_index.search(search_query.query, search_query.category)
+        page_ids = page_ranked(ranked, limit, cursor, response)
+        entries_by_id = {entry["id"]: entry async for entry in knowledge_base.find({"id": {"$in": page_ids}}, projection)}
+        entries = [entries_by_id[doc_id] for doc_id in page_ids if doc_id in entries_by_id]
+        
+        suggestion = search_index.did_you_mean(search_query.query)
+        if suggestion:
+            response.headers["X-Did-You-Mean"] = quote(suggestion)
     
-    if search_query.category:
-        query["category"] = search_query.category
+    return json_response(
+        orjson.dumps([select_fields(entry, requested_fields) for entry in entries]),
+        dict(response.headers)
+    )
+
+@app.get("/api/suggest")
+async def suggest_search(q: str = "", limit: int = 8):
+    """Autovervollständigung für die Suchleiste - öffentlich"""
+    return search_index.suggest(q, max(1, min(limit, MAX_SUGGESTIONS)))
+
+@app.get("/api/events")
+async def stream_changes():
+    """Änderungen an Einträgen, Kategorien und Statistiken als Server-Sent Events - öffentlich"""
+    async def events():
+        subscription = event_broker.subscribe()
+        try:
+            async for message in stream_events(subscription, EVENT_KEEPALIVE_SECONDS, EVENT_RETRY_MS):
+                yield message
+        finally:
+            event_broker.unsubscribe(subscription)
     
-    entries = list(knowledge_base.find(query).sort("created_at", -1))
-    result = []
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/export.ndjson")
+async def export_knowledge(attachments: bool = False, accept_encoding: Optional[str] = Header(None),
+                           current_user: str = Depends(verify_token)):
+    """Komplette Wissensdatenbank als NDJSON exportieren (optional mit Dateianhängen) - nur für Admins"""
+    filename = f"boettcher-wiki-export-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding"
+    }
     
-    for entry in entries:
-        entry["_id"] = str(entry["_id"])
-        result.append(KnowledgeEntry(**entry))
+    body = encode_ndjson(export_records(attachments))
+    if accept_encoding and "gzip" in accept_encoding.lower():
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_stream(body)
     
-    return result
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
 
 @app.post("/api/categories", response_model=Category)
 async def create_category(category: Category, current_user: str = Depends(verify_token)):
     """Neue Kategorie hinzufügen - nur für Admins"""
-    existing_category = categories_collection.find_one({"name": category.name})
+    existing_category = await categories_collection.find_one({"name": category.name})
     if existing_category:
         raise HTTPException(status_code=400, detail="Kategorie existiert bereits")
     
     category.id = str(uuid.uuid4())
     category.created_at = datetime.utcnow()
     
-    categories_collection.insert_one(category.dict())
+    try:
+        await categories_collection.insert_one(category.dict())
+    except DuplicateKeyError:
+        # Created concurrently by another request
+        raise HTTPException(status_code=400, detail="Kategorie existiert bereits")
+    
+    await response_cache.invalidate()
+    await publish_category_change("created", category.id, category.name)
     return category
 
 @app.get("/api/categories")
-async def get_categories():
+async def get_categories(response: Response, if_none_match: Optional[str] = Header(None)):
     """Verfügbare Kategorien abrufen - öffentlich"""
-    knowledge_categories = knowledge_base.distinct("category")
-    custom_categories = list(categories_collection.find({}))
-    
-    all_categories = set(knowledge_categories)
-    for cat in custom_categories:
-        all_categories.add(cat["name"])
+    async def load_categories():
+        knowledge_categories = await knowledge_base.distinct("category")
+        custom_categories = await categories_collection.find({}).to_list(length=None)
+        
+        all_categories = set(knowledge_categories)
+        for cat in custom_categories:
+            all_categories.add(cat["name"])
+        
+        return {"categories": list(all_categories)}
     
-    return {"categories": list(all_categories)}
+    return await cached_response(("categories",), load_categories, response, if_none_match)
 
 @app.get("/api/categories/detailed", response_model=List[Category])
 async def get_detailed_categories(current_user: str = Depends(verify_token)):
     """Detaillierte Kategorien für Admin-Interface"""
-    categories = list(categories_collection.find({}))
+    categories = await categories_collection.find({}).to_list(length=None)
     result = []
     
     for cat in categories:
@@ -346,71 +2136,96 @@ async def get_detailed_categories(current_user: str = Depends(verify_token)):
 @app.delete("/api/categories/{category_id}", response_model=DeleteResponse)
 async def delete_category(category_id: str, current_user: str = Depends(verify_token)):
     """Kategorie löschen - nur für Admins"""
-    category = categories_collection.find_one({"id": category_id})
+    category = await categories_collection.find_one({"id": category_id})
     if not category:
         raise HTTPException(status_code=404, detail="Kategorie nicht gefunden")
     
-    entries_using_category = knowledge_base.count_documents({"category": category["name"]})
+    entries_using_category = await knowledge_base.count_documents({"category": category["name"]})
     if entries_using_category > 0:
         raise HTTPException(
             status_code=400, 
             detail=f"Kategorie kann nicht gelöscht werden. {entries_using_category} Einträge verwenden diese Kategorie."
         )
     
-    result = categories_collection.delete_one({"id": category_id})
+    result = await categories_collection.delete_one({"id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Kategorie nicht gefunden")
     
+    await response_cache.invalidate()
+    await publish_category_change("deleted", category_id, category["name"])
+    
     return DeleteResponse(message="Kategorie erfolgreich gelöscht", deleted_id=category_id)
 
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(response: Response, if_none_match: Optional[str] = Header(None)):
     """Statistiken abrufen - öffentlich"""
-    total_entries = knowledge_base.count_documents({})
-    categories_count = len(knowledge_base.distinct("category"))
-    
-    # Count total attachments
-    total_attachments = 0
-    for entry in knowledge_base.find({}, {"attachments": 1}):
-        total_attachments += len(entry.get("attachments", []))
-    
-    return {
-        "total_entries": total_entries,
-        "categories_count": categories_count,
-        "total_attachments": total_attachments
-    }
+    return await cached_response(("stats",), current_stats, response, if_none_match)
 
 @app.put("/api/knowledge/{entry_id}", response_model=KnowledgeEntry)
 async def update_knowledge_entry(entry_id: str, entry: KnowledgeEntry, current_user: str = Depends(verify_token)):
     """Wissenseintrag aktualisieren - nur für Admins"""
-    existing_entry = knowledge_base.find_one({"id": entry_id})
+    existing_entry = await knowledge_base.find_one({"id": entry_id})
     if not existing_entry:
         raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
     
     entry.id = entry_id
     entry.updated_at = datetime.utcnow()
+    # The creation time is kept, clients usually don't send it back
+    entry.created_at = existing_entry.get("created_at") or entry.created_at or entry.updated_at
+    await externalize_attachments(entry.attachments)
+    
+    document = entry_document(entry)
+    await knowledge_base.replace_one({"id": entry_id}, document)
+    for indexed in await with_attachment_texts([document]):
+        search_index.add(indexed)
+    await record_entry_stats(existing_entry, document)
+    await response_cache.invalidate()
+    await publish_entry_change("updated", entry_id, document)
     
-    knowledge_base.replace_one({"id": entry_id}, entry.dict())
+    # Drop blobs of attachments that were removed from the entry
+    for file_id in attachment_ids(existing_entry) - attachment_ids(entry.dict()):
+        await delete_file(file_id)
     return entry
 
 @app.delete("/api/knowledge/{entry_id}", response_model=DeleteResponse)
 async def delete_knowledge_entry(entry_id: str, current_user: str = Depends(verify_token)):
     """Wissenseintrag löschen - nur für Admins"""
-    entry = knowledge_base.find_one({"id": entry_id})
+    entry = await knowledge_base.find_one({"id": entry_id})
     if not entry:
         raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
     
-    result = knowledge_base.delete_one({"id": entry_id})
+    result = await knowledge_base.delete_one({"id": entry_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
     
+    search_index.remove(entry_id)
+    await record_entry_stats(entry, None)
+    await response_cache.invalidate()
+    await publish_entry_change("deleted", entry_id)
+    for file_id in attachment_ids(entry):
+        await delete_file(file_id)
+    
     return DeleteResponse(message="Eintrag erfolgreich gelöscht", deleted_id=entry_id)
 
+@app.on_event("startup")
+async def provision_indexes():
+    """Indizes anlegen und Abfragepläne prüfen"""
+    await ensure_indexes()
+    await check_query_indexes()
+
+@app.on_event("startup")
+async def check_credentials():
+    """Anmeldungen nach Passwortänderung widerrufen"""
+    await revoke_tokens_on_password_change()
+
 # Initialize with sample data
 @app.on_event("startup")
 async def initialize_sample_data():
     """Beispieldaten hinzufügen falls Datenbank leer ist"""
-    if knowledge_base.count_documents({}) == 0:
+    await migrate_embedded_attachments()
+    await repair_missing_created_at()
+    
+    if await knowledge_base.count_documents({}) == 0:
         sample_entries = [
             {
                 "id": str(uuid.uuid4()),
@@ -464,10 +2279,12 @@ async def initialize_sample_data():
             }
         ]
         
-        knowledge_base.insert_many(sample_entries)
+        await knowledge_base.insert_many(sample_entries)
+        for entry in sample_entries:
+            await record_entry_stats(None, entry)
         print("Beispieldaten zur Wissensdatenbank hinzugefügt")
     
-    if categories_collection.count_documents({}) == 0:
+    if await categories_collection.count_documents({}) == 0:
         default_categories = [
             {
                 "id": str(uuid.uuid4()),
@@ -487,9 +2304,76 @@ async def initialize_sample_data():
             }
         ]
         
-        categories_collection.insert_many(default_categories)
+        await categories_collection.insert_many(default_categories)
         print("Standard-Kategorien hinzugefügt")
 
+@app.on_event("startup")
+async def build_stats():
+    """Statistik-Zähler aus der Wissensdatenbank aufbauen, falls noch nicht vorhanden"""
+    await ensure_stats()
+
+@app.on_event("startup")
+async def start_media_pool():
+    """Prozesspool für Bildverarbeitung starten"""
+    media_pool.start()
+
+@app.on_event("startup")
+async def load_derivative_cache():
+    """Zwischenspeicher für Bildvarianten einlesen"""
+    await asyncio.to_thread(derivative_cache.load)
+
+@app.on_event("startup")
+async def start_event_watcher():
+    """Change Stream für Server-Sent Events starten"""
+    global event_watcher
+    event_watcher = asyncio.create_task(watch_events())
+
+@app.on_event("shutdown")
+async def stop_event_watcher():
+    """Change Stream beenden"""
+    if event_watcher:
+        event_watcher.cancel()
+
+@app.on_event("startup")
+async def start_upload_cleaner():
+    """Regelmäßiges Aufräumen abgebrochener Uploads starten"""
+    global upload_cleaner
+    upload_cleaner = asyncio.create_task(cleanup_upload_sessions())
+
+@app.on_event("shutdown")
+async def stop_upload_cleaner():
+    """Aufräumen abgebrochener Uploads beenden"""
+    if upload_cleaner:
+        upload_cleaner.cancel()
+
+@app.on_event("shutdown")
+async def stop_text_extraction():
+    """Textextraktion beenden"""
+    if text_extractor:
+        text_extractor.cancel()
+
+@app.on_event("shutdown")
+async def stop_media_pool():
+    """Prozesspool für Bildverarbeitung beenden"""
+    media_pool.shutdown()
+
+@app.on_event("startup")
+async def build_search_index():
+    """Suchindex aus der Wissensdatenbank aufbauen"""
+    entries = await knowledge_base.find({}, SEARCH_INDEX_PROJECTION).to_list(length=None)
+    search_index.rebuild(await with_attachment_texts(entries))
+    print(f"Suchindex mit {len(search_index)} Einträgen aufgebaut")
+
+@app.on_event("startup")
+async def start_text_extraction():
+    """Textextraktion aus Dokumentanhängen im Hintergrund starten"""
+    global text_extraction_queue, text_extractor
+    text_extraction_queue = asyncio.Queue()
+    await queue_missing_text_extractions()
+    text_extractor = asyncio.create_task(run_text_extraction())
+    if text_extraction_queue.qsize():
+        print(f"{text_extraction_queue.qsize()} Dokumente zur Textextraktion eingereiht")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
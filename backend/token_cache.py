@@ -0,0 +1,111 @@
+"""Cache of verified access tokens and server-side token revocation
+
+Verifying the JWT signature on every admin request is wasted work when the
+UI sends the same token many times per screen. Verified tokens are kept in
+a bounded LRU keyed by the SHA-256 digest of the token (the token itself is
+never stored) until they expire.
+
+Revocations live in MongoDB so they survive restarts and reach every worker
+within one poll interval: single tokens (logout) and all tokens of a user
+issued before a point in time (e.g. after a password change). Revocation
+documents expire together with the tokens they cover.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+import hashlib
+import time
+
+TOKEN_PREFIX = "token:"
+USER_PREFIX = "user:"
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    def __init__(self, max_entries: int, revocations_collection, poll_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.revocations_collection = revocations_collection
+        self.poll_interval = poll_interval
+        self.entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()  # digest -> (username, exp, iat)
+        self.revoked_tokens: Set[str] = set()  # Digests
+        self.revoked_before: Dict[str, float] = {}  # username -> tokens issued earlier are invalid
+        self.last_poll = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    async def refresh(self):
+        """Pick up revocations made by other workers"""
+        now = time.monotonic()
+        if now - self.last_poll < self.poll_interval:
+            return
+        self.last_poll = now
+
+        revoked_tokens = set()
+        revoked_before = {}
+        async for revocation in self.revocations_collection.find({"type": {"$in": ["token", "user"]}}):
+            if revocation["type"] == "token":
+                revoked_tokens.add(revocation["_id"][len(TOKEN_PREFIX):])
+            else:
+                revoked_before[revocation["_id"][len(USER_PREFIX):]] = revocation["revoked_before"]
+        self.revoked_tokens = revoked_tokens
+        self.revoked_before = revoked_before
+
+    def is_revoked(self, digest: str, username: str, issued_at: float) -> bool:
+        return digest in self.revoked_tokens or issued_at < self.revoked_before.get(username, 0.0)
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return the user of a previously verified, still valid token"""
+        cached = self.entries.get(digest)
+        if cached is None:
+            self.misses += 1
+            return None
+        username, expires, issued_at = cached
+        if expires <= time.time() or self.is_revoked(digest, username, issued_at):
+            del self.entries[digest]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(digest)
+        self.hits += 1
+        return username
+
+    def put(self, digest: str, username: str, expires: float, issued_at: float):
+        self.entries[digest] = (username, expires, issued_at)
+        self.entries.move_to_end(digest)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def revoke_token(self, digest: str, expires: float):
+        """Invalidate a single token until it expires anyway"""
+        await self.revocations_collection.replace_one(
+            {"_id": TOKEN_PREFIX + digest},
+            {"type": "token", "expires_at": datetime.utcfromtimestamp(expires)},
+            upsert=True
+        )
+        self.revoked_tokens.add(digest)
+        self.entries.pop(digest, None)
+
+    async def revoke_user(self, username: str, token_lifetime_seconds: float):
+        """Invalidate all tokens of a user issued up to now"""
+        revoked_before = time.time()
+        await self.revocations_collection.replace_one(
+            {"_id": USER_PREFIX + username},
+            {
+                "type": "user",
+                "revoked_before": revoked_before,
+                # Once all earlier tokens have expired the revocation is no longer needed
+                "expires_at": datetime.utcfromtimestamp(revoked_before + token_lifetime_seconds)
+            },
+            upsert=True
+        )
+        self.revoked_before[username] = revoked_before
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "revoked_tokens": len(self.revoked_tokens),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -307,7 +307,8 @@ class BöttcherWikiKnowledgeBaseTester:
             
             if response.status_code == 200:
                 data = response.json()
-                if data.get("id") == entry_id and "Aktualisiert" in data.get("question", ""):
+                # created_at is not sent back but must be kept for list cursors
+                if data.get("id") == entry_id and "Aktualisiert" in data.get("question", "") and data.get("created_at"):
                     self.log_test("Update Knowledge Entry", True, f"Successfully updated entry {entry_id}")
                     return True
                 else:
@@ -442,6 +443,157 @@ class BöttcherWikiKnowledgeBaseTester:
             self.log_test("Data Persistence", False, f"Error: {str(e)}")
         return False
         
+    def get_admin_token(self):
+        """Log in as admin, needed to import the entries for the pagination tests"""
+        response = requests.post(
+            f"{self.base_url}/admin/login",
+            json={"username": "admin", "password": "boettcher2024"},
+            timeout=10
+        )
+        return response.json()["access_token"] if response.status_code == 200 else None
+        
+    def import_pagination_entries(self, token, marker, count=5):
+        """Bulk import entries that share created_at, so only the id orders them"""
+        records = [
+            {
+                "question": f"Seitenweise Anzeige {marker} Nummer {i}",
+                "answer": f"Eintrag für den Paginierungstest {marker}",
+                "category": "Verwaltung",
+                "tags": [marker],
+                "created_at": "2001-01-01T00:00:00"
+            }
+            for i in range(count)
+        ]
+        response = requests.post(
+            f"{self.base_url}/knowledge/bulk",
+            data="\n".join(json.dumps(record) for record in records).encode("utf-8"),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+            timeout=30
+        )
+        return [result["id"] for result in response.json()["results"] if result["status"] == "created"]
+        
+    def delete_entries(self, token, entry_ids):
+        for entry_id in entry_ids:
+            requests.delete(
+                f"{self.base_url}/knowledge/{entry_id}",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=10
+            )
+        
+    def walk_pages(self, fetch_page):
+        """Follow X-Next-Cursor from the first page to the last and return all ids in order"""
+        ids = []
+        cursor = None
+        for _ in range(1000):
+            response = fetch_page(cursor)
+            if response.status_code != 200:
+                raise AssertionError(f"Status code {response.status_code} for cursor {cursor}")
+            ids += [entry["id"] for entry in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return ids
+        raise AssertionError("Pagination did not end")
+        
+    def test_list_pagination(self):
+        """Test walking GET /api/knowledge page by page, including equal created_at"""
+        token = self.get_admin_token()
+        if not token:
+            self.log_test("List Pagination", False, "Admin login failed")
+            return False
+            
+        marker = f"seitentest{uuid.uuid4().hex[:8]}"
+        created_ids = self.import_pagination_entries(token, marker)
+        try:
+            for category in (None, "Verwaltung"):
+                params = {"limit": 2}
+                if category:
+                    params["category"] = category
+                    
+                paged = self.walk_pages(lambda cursor: requests.get(
+                    f"{self.base_url}/knowledge",
+                    params={**params, **({"cursor": cursor} if cursor else {})},
+                    timeout=10
+                ))
+                full = requests.get(f"{self.base_url}/knowledge", params={**params, "limit": 500}, timeout=10)
+                
+                if len(paged) != len(set(paged)):
+                    self.log_test("List Pagination", False, f"Duplicate entries across pages (category {category})")
+                    return False
+                missing = set(created_ids) - set(paged)
+                if len(created_ids) != 5 or missing:
+                    self.log_test("List Pagination", False, f"Entries with equal created_at missing: {missing}")
+                    return False
+                if not full.headers.get("X-Next-Cursor") and paged != [entry["id"] for entry in full.json()]:
+                    self.log_test("List Pagination", False, f"Pages differ from the full list (category {category})")
+                    return False
+            
+            self.log_test("List Pagination", True, "Walked all pages without duplicates or gaps")
+            return True
+            
+        except Exception as e:
+            self.log_test("List Pagination", False, f"Error: {str(e)}")
+        finally:
+            self.delete_entries(token, created_ids)
+        return False
+        
+    def test_search_pagination(self):
+        """Test walking POST /api/search results page by page with tied scores"""
+        token = self.get_admin_token()
+        if not token:
+            self.log_test("Search Pagination", False, "Admin login failed")
+            return False
+            
+        marker = f"seitentest{uuid.uuid4().hex[:8]}"
+        created_ids = self.import_pagination_entries(token, marker)
+        try:
+            # All entries score the same for the marker, so ties decide the order
+            paged = self.walk_pages(lambda cursor: requests.post(
+                f"{self.base_url}/search",
+                params={"limit": 2, **({"cursor": cursor} if cursor else {})},
+                json={"query": marker},
+                timeout=10
+            ))
+            full = requests.post(f"{self.base_url}/search", json={"query": marker}, timeout=10)
+            
+            if len(paged) != len(set(paged)):
+                self.log_test("Search Pagination", False, f"Duplicate results across pages: {paged}")
+            elif sorted(paged) != sorted(created_ids) or paged != [entry["id"] for entry in full.json()]:
+                self.log_test("Search Pagination", False, f"Pages differ from the full result: {paged}")
+            else:
+                self.log_test("Search Pagination", True, f"{len(paged)} results over {(len(paged) + 1) // 2} pages")
+                return True
+                
+        except Exception as e:
+            self.log_test("Search Pagination", False, f"Error: {str(e)}")
+        finally:
+            self.delete_entries(token, created_ids)
+        return False
+        
+    def test_malformed_cursor(self):
+        """Test that malformed cursors are rejected with 400"""
+        # Not base64, base64 of something else, and a cursor of the wrong size
+        cursors = ["nicht-gueltig!", "eyJhIjogMX0", "WzFd"]
+        try:
+            for cursor in cursors:
+                list_response = requests.get(f"{self.base_url}/knowledge", params={"cursor": cursor}, timeout=10)
+                search_response = requests.post(
+                    f"{self.base_url}/search",
+                    params={"cursor": cursor},
+                    json={"query": "Scanner"},
+                    timeout=10
+                )
+                if list_response.status_code != 400 or search_response.status_code != 400:
+                    self.log_test("Malformed Cursor", False,
+                                  f"{cursor}: list {list_response.status_code}, search {search_response.status_code}")
+                    return False
+            
+            self.log_test("Malformed Cursor", True, "Malformed cursors rejected with 400")
+            return True
+            
+        except Exception as e:
+            self.log_test("Malformed Cursor", False, f"Error: {str(e)}")
+        return False
+        
     def run_all_tests(self):
         """Run all tests in sequence"""
         print("=" * 70)
@@ -462,6 +614,9 @@ class BöttcherWikiKnowledgeBaseTester:
             ("Update Knowledge Entry", self.test_update_knowledge_entry),
             ("Delete Knowledge Entry", self.test_delete_knowledge_entry),
             ("Edge Cases", self.test_edge_cases),
+            ("List Pagination", self.test_list_pagination),
+            ("Search Pagination", self.test_search_pagination),
+            ("Malformed Cursor", self.test_malformed_cursor),
             ("Data Persistence", self.test_data_persistence)
         ]
         
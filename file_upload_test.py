@@ -168,7 +168,7 @@ startxref
             
             if response.status_code == 200:
                 data = response.json()
-                required_fields = ['id', 'filename', 'file_type', 'file_size', 'content_type', 'file_data', 'uploaded_at']
+                required_fields = ['id', 'filename', 'file_type', 'file_size', 'content_type', 'uploaded_at']
                 
                 if all(field in data for field in required_fields):
                     # Check if thumbnail was generated for image
@@ -210,7 +210,7 @@ startxref
             
             if response.status_code == 200:
                 data = response.json()
-                required_fields = ['id', 'filename', 'file_type', 'file_size', 'content_type', 'file_data', 'uploaded_at']
+                required_fields = ['id', 'filename', 'file_type', 'file_size', 'content_type', 'uploaded_at']
                 
                 if all(field in data for field in required_fields):
                     # PDF should not have thumbnail
@@ -229,6 +229,40 @@ startxref
             self.log_test("Upload PDF File", False, f"Error: {str(e)}")
         return False
         
+    def test_content_type_follows_extension(self):
+        """Test that a sniffed type from another file class does not override the extension"""
+        if not self.auth_token:
+            self.log_test("Content Type Follows Extension", False, "No authentication token")
+            return False
+            
+        try:
+            # Image bytes behind a .txt name must not end up on the image paths
+            files = {
+                'file': ('notizen.txt', self.create_test_image(), 'text/plain')
+            }
+            
+            response = requests.post(
+                f"{self.base_url}/upload",
+                files=files,
+                headers=self.get_auth_headers(),
+                timeout=10
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                requests.delete(f"{self.base_url}/files/{data['id']}", headers=self.get_auth_headers(), timeout=10)
+                if data.get('content_type') == 'text/plain' and not data.get('thumbnail'):
+                    self.log_test("Content Type Follows Extension", True, "Stored as text/plain")
+                    return True
+                else:
+                    self.log_test("Content Type Follows Extension", False, f"Unexpected content type: {data.get('content_type')}")
+            else:
+                self.log_test("Content Type Follows Extension", False, f"Status code: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Content Type Follows Extension", False, f"Error: {str(e)}")
+        return False
+        
     def test_file_size_validation(self):
         """Test file size validation (should reject files > 10MB)"""
         if not self.auth_token:
@@ -442,6 +476,104 @@ startxref
             self.log_test("File Download", False, f"Error: {str(e)}")
         return False
         
+    def test_file_download_range(self):
+        """Test partial file download with HTTP Range header"""
+        if not self.uploaded_files:
+            self.log_test("File Download Range", False, "No uploaded files to download")
+            return False
+            
+        try:
+            file_info = self.uploaded_files[0]
+            file_id = file_info['id']
+            
+            full = requests.get(f"{self.base_url}/files/{file_id}/download", timeout=10)
+            response = requests.get(
+                f"{self.base_url}/files/{file_id}/download",
+                headers={"Range": "bytes=10-49"},
+                timeout=10
+            )
+            
+            if response.status_code == 206:
+                expected_range = f"bytes 10-49/{file_info['file_size']}"
+                if response.headers.get('Content-Range') != expected_range:
+                    self.log_test("File Download Range", False, f"Unexpected Content-Range: {response.headers.get('Content-Range')}")
+                elif response.headers.get('Accept-Ranges') != 'bytes':
+                    self.log_test("File Download Range", False, "Missing Accept-Ranges header")
+                elif response.content != full.content[10:50]:
+                    self.log_test("File Download Range", False, "Partial content does not match full download")
+                else:
+                    self.log_test("File Download Range", True, "Range request returned correct 40 bytes")
+                    return True
+            else:
+                self.log_test("File Download Range", False, f"Expected 206, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_test("File Download Range", False, f"Error: {str(e)}")
+        return False
+        
+    def test_file_download_range_not_satisfiable(self):
+        """Test that ranges starting at or past the end of the file get 416"""
+        if not self.uploaded_files:
+            self.log_test("File Download Range Not Satisfiable", False, "No uploaded files to download")
+            return False
+            
+        try:
+            file_info = self.uploaded_files[0]
+            length = file_info['file_size']
+            # bytes=<length>- is what a client sends to resume a download that is already complete
+            for byte_range in (f"bytes={length}-", f"bytes={length + 10}-{length + 20}", "bytes=-0"):
+                response = requests.get(
+                    f"{self.base_url}/files/{file_info['id']}/download",
+                    headers={"Range": byte_range},
+                    timeout=10
+                )
+                if response.status_code != 416:
+                    self.log_test("File Download Range Not Satisfiable", False,
+                                  f"{byte_range}: expected 416, got {response.status_code}")
+                    return False
+                if response.headers.get('Content-Range') != f"bytes */{length}":
+                    self.log_test("File Download Range Not Satisfiable", False,
+                                  f"{byte_range}: unexpected Content-Range: {response.headers.get('Content-Range')}")
+                    return False
+            
+            self.log_test("File Download Range Not Satisfiable", True, "Unsatisfiable ranges answered with 416")
+            return True
+                
+        except Exception as e:
+            self.log_test("File Download Range Not Satisfiable", False, f"Error: {str(e)}")
+        return False
+        
+    def test_file_download_not_modified(self):
+        """Test conditional file download with If-None-Match"""
+        if not self.uploaded_files:
+            self.log_test("File Download Not Modified", False, "No uploaded files to download")
+            return False
+            
+        try:
+            file_id = self.uploaded_files[0]['id']
+            
+            full = requests.get(f"{self.base_url}/files/{file_id}/download", timeout=10)
+            etag = full.headers.get('ETag')
+            if not etag:
+                self.log_test("File Download Not Modified", False, "Missing ETag header")
+                return False
+            
+            response = requests.get(
+                f"{self.base_url}/files/{file_id}/download",
+                headers={"If-None-Match": etag},
+                timeout=10
+            )
+            
+            if response.status_code == 304 and not response.content:
+                self.log_test("File Download Not Modified", True, "Matching ETag returned 304 without body")
+                return True
+            else:
+                self.log_test("File Download Not Modified", False, f"Expected 304, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_test("File Download Not Modified", False, f"Error: {str(e)}")
+        return False
+        
     def test_download_nonexistent_file(self):
         """Test downloading non-existent file (should return 404)"""
         try:
@@ -533,6 +665,46 @@ startxref
             self.log_test("Multiple File Types", False, f"Only {success_count}/3 file types uploaded successfully")
             return False
         
+    def test_batch_upload(self):
+        """Test uploading several files in one batch request"""
+        if not self.auth_token:
+            self.log_test("Batch Upload", False, "No authentication token")
+            return False
+            
+        try:
+            files = [
+                ('files', ('batch_red.png', self.create_test_image(120, 80, 'PNG'), 'image/png')),
+                ('files', ('batch_notes.txt', f'Batch {uuid.uuid4()}'.encode(), 'text/plain')),
+                ('files', ('batch_setup.exe', b'MZ fake executable', 'application/octet-stream'))
+            ]
+            
+            response = requests.post(
+                f"{self.base_url}/upload/batch",
+                files=files,
+                headers=self.get_auth_headers(),
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                results = data.get('results', [])
+                statuses = [result.get('status') for result in results]
+                
+                if data.get('uploaded') == 2 and data.get('failed') == 1 and statuses == ['uploaded', 'uploaded', 'error']:
+                    if results[0]['file'].get('thumbnail'):
+                        self.log_test("Batch Upload", True, "Uploaded 2 files, rejected unsupported file type")
+                        return True
+                    else:
+                        self.log_test("Batch Upload", False, "Image in batch has no thumbnail")
+                else:
+                    self.log_test("Batch Upload", False, f"Unexpected results: {data}")
+            else:
+                self.log_test("Batch Upload", False, f"Status code: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Batch Upload", False, f"Error: {str(e)}")
+        return False
+        
     def run_all_tests(self):
         """Run all file upload tests in sequence"""
         print("=" * 70)
@@ -552,11 +724,16 @@ startxref
             ("Upload PDF File", self.test_upload_pdf_file),
             ("File Size Validation", self.test_file_size_validation),
             ("File Type Validation", self.test_file_type_validation),
+            ("Content Type Follows Extension", self.test_content_type_follows_extension),
             ("Empty File Validation", self.test_empty_file_validation),
             ("Multiple File Types", self.test_multiple_file_types),
+            ("Batch Upload", self.test_batch_upload),
             ("Knowledge Entry with Attachments", self.test_create_knowledge_entry_with_attachments),
             ("Retrieve Knowledge with Attachments", self.test_retrieve_knowledge_with_attachments),
             ("File Download", self.test_file_download),
+            ("File Download Range", self.test_file_download_range),
+            ("File Download Range Not Satisfiable", self.test_file_download_range_not_satisfiable),
+            ("File Download Not Modified", self.test_file_download_not_modified),
             ("Download Non-existent File", self.test_download_nonexistent_file),
             ("Stats Include Attachments", self.test_stats_include_attachments)
         ]
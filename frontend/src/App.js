@@ -1,7 +1,12 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+// Files above the direct upload limit are sent through resumable uploads
+const DIRECT_UPLOAD_LIMIT = 10 * 1024 * 1024;
+const RESUMABLE_PIECE_SIZE = 8 * 1024 * 1024;
+const RESUMABLE_MAX_RETRIES = 5;
+const MAX_BATCH_FILES = 50;
 
 function App() {
   const [knowledgeEntries, setKnowledgeEntries] = useState([]);
@@ -19,6 +24,13 @@ function App() {
   const [deleteConfirm, setDeleteConfirm] = useState(null);
   const [uploadedFiles, setUploadedFiles] = useState([]);
   const [isDragOver, setIsDragOver] = useState(false);
+  const [searchSuggestion, setSearchSuggestion] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [autocomplete, setAutocomplete] = useState({ questions: [], tags: [] });
+  const autocompleteRequest = useRef(null);
+  const listFilter = useRef({ query: '', category: '' });
+  // Fetches the next page of whatever list is shown (all entries, a category or search results)
+  const loadNextPage = useRef(null);
 
   // Form states
   const [newEntry, setNewEntry] = useState({
@@ -48,6 +60,58 @@ function App() {
     checkAdminStatus();
   }, []);
 
+  useEffect(() => {
+    listFilter.current = { query: searchQuery, category: selectedCategory };
+  }, [searchQuery, selectedCategory]);
+
+  // Live updates: apply changes pushed by the server instead of polling
+  useEffect(() => {
+    const events = new EventSource(`${BACKEND_URL}/api/events`);
+    let reconnecting = false;
+
+    const resync = () => {
+      const { query, category } = listFilter.current;
+      if (!query && !category) {
+        fetchKnowledgeEntries();
+      }
+      fetchCategories();
+      fetchStats();
+    };
+
+    events.addEventListener('knowledge', (event) => applyKnowledgeChange(JSON.parse(event.data)));
+    events.addEventListener('category', () => fetchCategories());
+    events.addEventListener('stats', (event) => setStats(JSON.parse(event.data).stats));
+    events.addEventListener('reset', resync);
+    events.onerror = () => {
+      reconnecting = true;
+    };
+    events.onopen = () => {
+      // Changes made while disconnected were missed
+      if (reconnecting) {
+        reconnecting = false;
+        resync();
+      }
+    };
+
+    return () => events.close();
+  }, []);
+
+  const applyKnowledgeChange = (change) => {
+    setKnowledgeEntries(prev => {
+      if (change.op === 'deleted') {
+        return prev.filter(entry => entry.id !== change.id);
+      }
+      if (prev.some(entry => entry.id === change.id)) {
+        return prev.map(entry => (entry.id === change.id ? change.entry : entry));
+      }
+      const { query, category } = listFilter.current;
+      if (change.op === 'created' && !query && (!category || category === change.entry.category)) {
+        return [change.entry, ...prev];
+      }
+      return prev;
+    });
+  };
+
   const checkAdminStatus = async () => {
     const token = localStorage.getItem('admin_token');
     if (token) {
@@ -72,11 +136,21 @@ function App() {
     }
   };
 
-  const fetchKnowledgeEntries = async () => {
+  const fetchKnowledgeEntries = async (cursor = null, category = '') => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/knowledge`);
+      const params = new URLSearchParams();
+      if (category) {
+        params.set('category', category);
+      }
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const query = params.toString();
+      const response = await fetch(`${BACKEND_URL}/api/knowledge${query ? `?${query}` : ''}`);
       const data = await response.json();
-      setKnowledgeEntries(data);
+      setKnowledgeEntries(prev => (cursor ? [...prev, ...data] : data));
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+      loadNextPage.current = (next) => fetchKnowledgeEntries(next, category);
     } catch (error) {
       console.error('Error fetching knowledge entries:', error);
     }
@@ -133,32 +207,87 @@ function App() {
     }
   };
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
+    const token = localStorage.getItem('admin_token');
+    // Revoke the token on the server as well; logging out locally must not depend on it
+    try {
+      await fetch(`${BACKEND_URL}/api/admin/logout`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+    } catch (error) {
+      console.error('Error logging out:', error);
+    }
     localStorage.removeItem('admin_token');
     setIsAdmin(false);
     setAdminUser('');
   };
 
-  const handleSearch = async () => {
-    if (!searchQuery.trim() && !selectedCategory) {
+  const handleSearchInput = async (value) => {
+    setSearchQuery(value);
+    
+    // Only the latest keystroke matters
+    if (autocompleteRequest.current) {
+      autocompleteRequest.current.abort();
+    }
+    if (!value.trim()) {
+      setAutocomplete({ questions: [], tags: [] });
+      return;
+    }
+    
+    const controller = new AbortController();
+    autocompleteRequest.current = controller;
+    try {
+      const response = await fetch(`${BACKEND_URL}/api/suggest?q=${encodeURIComponent(value)}&limit=5`, {
+        signal: controller.signal
+      });
+      setAutocomplete(await response.json());
+    } catch (error) {
+      if (error.name !== 'AbortError') {
+        console.error('Error fetching suggestions:', error);
+      }
+    }
+  };
+
+  const selectAutocomplete = (value) => {
+    setSearchQuery(value);
+    setAutocomplete({ questions: [], tags: [] });
+    handleSearch(value);
+  };
+
+  const handleSearch = async (query = searchQuery, cursor = null, category = selectedCategory) => {
+    if (!cursor) {
+      setSearchSuggestion('');
+    }
+    setAutocomplete({ questions: [], tags: [] });
+    if (!query.trim() && !category) {
       fetchKnowledgeEntries();
       return;
     }
     
     setLoading(true);
     try {
-      const response = await fetch(`${BACKEND_URL}/api/search`, {
+      const url = cursor
+        ? `${BACKEND_URL}/api/search?cursor=${encodeURIComponent(cursor)}`
+        : `${BACKEND_URL}/api/search`;
+      const response = await fetch(url, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          query: searchQuery,
-          category: selectedCategory || null
+          query: query,
+          category: category || null
         })
       });
       const data = await response.json();
-      setKnowledgeEntries(data);
+      if (!cursor) {
+        const suggestion = response.headers.get('X-Did-You-Mean');
+        setSearchSuggestion(suggestion ? decodeURIComponent(suggestion) : '');
+      }
+      setKnowledgeEntries(prev => (cursor ? [...prev, ...data] : data));
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+      loadNextPage.current = (next) => handleSearch(query, next, category);
     } catch (error) {
       console.error('Error searching knowledge:', error);
     } finally {
@@ -171,16 +300,7 @@ function App() {
     setSearchQuery('');
     if (category) {
       setLoading(true);
-      fetch(`${BACKEND_URL}/api/knowledge?category=${category}`)
-        .then(response => response.json())
-        .then(data => {
-          setKnowledgeEntries(data);
-          setLoading(false);
-        })
-        .catch(error => {
-          console.error('Error filtering by category:', error);
-          setLoading(false);
-        });
+      fetchKnowledgeEntries(null, category).finally(() => setLoading(false));
     } else {
       fetchKnowledgeEntries();
     }
@@ -225,25 +345,149 @@ function App() {
     }
   };
 
-  const handleFileUpload = async (files) => {
-    const token = localStorage.getItem('admin_token');
-    const newFiles = [];
+  const hashFile = async (file) => {
+    // crypto.subtle is only available in secure contexts
+    if (!window.crypto || !window.crypto.subtle) {
+      return null;
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+  };
+
+  const attachKnownFile = async (file, token) => {
+    const sha256 = await hashFile(file);
+    if (!sha256) {
+      return null;
+    }
     
-    for (const file of files) {
+    const check = await fetch(`${BACKEND_URL}/api/files/hash/${sha256}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    if (!check.ok || !(await check.json()).exists) {
+      return null;
+    }
+    
+    const formData = new FormData();
+    formData.append('filename', file.name);
+    const response = await fetch(`${BACKEND_URL}/api/files/hash/${sha256}`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`
+      },
+      body: formData
+    });
+    return response.ok ? await response.json() : null;
+  };
+
+  // Sends large files in pieces; after a dropped connection the upload
+  // continues at the offset the server reports instead of starting over
+  const uploadResumable = async (file, token) => {
+    const headers = { 'Authorization': `Bearer ${token}` };
+    const created = await fetch(`${BACKEND_URL}/api/uploads`, {
+      method: 'POST',
+      headers: { ...headers, 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, length: file.size })
+    });
+    if (!created.ok) return null;
+    const session = await created.json();
+    const url = `${BACKEND_URL}/api/uploads/${session.id}`;
+    
+    const readOffset = (response) => {
+      const value = response.headers.get('Upload-Offset');
+      if (value === null) throw new Error('Upload-Offset fehlt in der Antwort');
+      return Number(value);
+    };
+    
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
       try {
-        const formData = new FormData();
-        formData.append('file', file);
-        
-        const response = await fetch(`${BACKEND_URL}/api/upload`, {
+        const response = await fetch(url, {
+          method: 'PATCH',
+          headers: { ...headers, 'Upload-Offset': String(offset) },
+          body: file.slice(offset, offset + RESUMABLE_PIECE_SIZE)
+        });
+        if (!response.ok && response.status !== 409) throw new Error(`Upload fehlgeschlagen (${response.status})`);
+        const next = readOffset(response);
+        if (response.status === 409) {
+          // A conflict only tells us where to continue; at the same offset the session is still busy
+          if (next === offset) throw new Error('Upload läuft bereits');
+          offset = next;
+        } else {
+          offset = next;
+          failures = 0;
+        }
+      } catch (error) {
+        if (++failures > RESUMABLE_MAX_RETRIES) throw error;
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        const status = await fetch(url, { method: 'HEAD', headers }).catch(() => null);
+        if (status && status.ok && status.headers.get('Upload-Offset') !== null) {
+          offset = Number(status.headers.get('Upload-Offset'));
+        }
+      }
+    }
+    
+    const response = await fetch(`${url}/finalize`, { method: 'POST', headers });
+    return response.ok ? await response.json() : null;
+  };
+
+  // Small files go to the server together in one batch request
+  const uploadBatch = async (files, token) => {
+    const uploaded = [];
+    for (let start = 0; start < files.length; start += MAX_BATCH_FILES) {
+      const batch = files.slice(start, start + MAX_BATCH_FILES);
+      const formData = new FormData();
+      batch.forEach(file => formData.append('files', file));
+      
+      try {
+        const response = await fetch(`${BACKEND_URL}/api/upload/batch`, {
           method: 'POST',
           headers: {
             'Authorization': `Bearer ${token}`
           },
           body: formData
         });
+        if (!response.ok) throw new Error(`Upload fehlgeschlagen (${response.status})`);
         
-        if (response.ok) {
-          const uploadedFile = await response.json();
+        const { results } = await response.json();
+        for (const result of results) {
+          if (result.status === 'uploaded') {
+            uploaded.push(result.file);
+          } else {
+            alert(`Fehler beim Hochladen von ${result.filename}: ${result.error}`);
+          }
+        }
+      } catch (error) {
+        console.error('Error uploading files:', error);
+        alert(`Fehler beim Hochladen von ${batch.map(file => file.name).join(', ')}`);
+      }
+    }
+    return uploaded;
+  };
+
+  const handleFileUpload = async (files) => {
+    const token = localStorage.getItem('admin_token');
+    const newFiles = [];
+    const directFiles = [];
+    
+    for (const file of files) {
+      try {
+        // Skip the upload when the server already stores identical content
+        const knownFile = await attachKnownFile(file, token);
+        if (knownFile) {
+          newFiles.push(knownFile);
+          continue;
+        }
+        
+        if (file.size <= DIRECT_UPLOAD_LIMIT) {
+          directFiles.push(file);
+          continue;
+        }
+        
+        const uploadedFile = await uploadResumable(file, token);
+        if (uploadedFile) {
           newFiles.push(uploadedFile);
         } else {
           alert(`Fehler beim Hochladen von ${file.name}`);
@@ -254,6 +498,7 @@ function App() {
       }
     }
     
+    newFiles.push(...await uploadBatch(directFiles, token));
     setUploadedFiles(prev => [...prev, ...newFiles]);
   };
 
@@ -282,6 +527,11 @@ function App() {
 
   const removeUploadedFile = (fileId) => {
     setUploadedFiles(prev => prev.filter(file => file.id !== fileId));
+    // Files not yet saved with an entry are deleted right away; attached ones are kept by the server
+    fetch(`${BACKEND_URL}/api/files/${fileId}`, {
+      method: 'DELETE',
+      headers: { 'Authorization': `Bearer ${localStorage.getItem('admin_token')}` }
+    }).catch(error => console.error('Error discarding file:', error));
   };
 
   const downloadFile = (fileId, filename) => {
@@ -303,6 +553,8 @@ function App() {
         return '📊';
       case 'presentations':
         return '📋';
+      case 'videos':
+        return '🎬';
       default:
         return '📎';
     }
@@ -575,20 +827,62 @@ function App() {
                 placeholder="Suche nach Fragen oder Lösungen..."
                 className="w-full px-4 py-2 pl-10 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                 value={searchQuery}
-                onChange={(e) => setSearchQuery(e.target.value)}
+                onChange={(e) => handleSearchInput(e.target.value)}
+                onKeyDown={(e) => e.key === 'Enter' && handleSearch()}
               />
               <svg className="w-5 h-5 absolute left-3 top-2.5 text-gray-400" fill="currentColor" viewBox="0 0 20 20">
                 <path fillRule="evenodd" d="M8 4a4 4 0 100 8 4 4 0 000-8zM2 8a6 6 0 1110.89 3.476l4.817 4.817a1 1 0 01-1.414 1.414l-4.816-4.816A6 6 0 012 8z" clipRule="evenodd" />
               </svg>
+              {(autocomplete.questions.length > 0 || autocomplete.tags.length > 0) && (
+                <div className="absolute z-10 w-full mt-1 bg-white border border-gray-200 rounded-lg shadow-lg">
+                  {autocomplete.questions.map((item) => (
+                    <button
+                      key={item.id}
+                      onClick={() => selectAutocomplete(item.question)}
+                      className="block w-full text-left px-4 py-2 hover:bg-blue-50"
+                    >
+                      {item.question}
+                    </button>
+                  ))}
+                  {autocomplete.tags.length > 0 && (
+                    <div className="flex flex-wrap gap-2 px-4 py-2 border-t border-gray-100">
+                      {autocomplete.tags.map((tag) => (
+                        <button
+                          key={tag}
+                          onClick={() => selectAutocomplete(tag)}
+                          className="px-2 py-1 bg-gray-100 text-gray-700 text-xs rounded-full hover:bg-blue-100"
+                        >
+                          #{tag}
+                        </button>
+                      ))}
+                    </div>
+                  )}
+                </div>
+              )}
             </div>
             <button
-              onClick={handleSearch}
+              onClick={() => handleSearch()}
               disabled={loading}
               className="px-6 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition-colors disabled:opacity-50"
             >
               {loading ? 'Suche...' : 'Suchen'}
             </button>
           </div>
+          {searchSuggestion && (
+            <div className="mt-3 text-sm text-gray-600">
+              Meinten Sie:{' '}
+              <button
+                onClick={() => {
+                  setSearchQuery(searchSuggestion);
+                  handleSearch(searchSuggestion);
+                }}
+                className="text-blue-600 hover:underline font-medium"
+              >
+                {searchSuggestion}
+              </button>
+              ?
+            </div>
+          )}
         </div>
 
         {/* Admin Action Buttons - nur für eingeloggte Admins */}
@@ -682,9 +976,9 @@ function App() {
                         <div className="flex flex-wrap gap-2">
                           {entry.attachments.map(attachment => (
                             <div key={attachment.id} className="flex items-center bg-gray-50 rounded-lg p-2 text-sm">
-                              {attachment.file_type === 'images' && attachment.thumbnail ? (
+                              {attachment.file_type === 'images' && attachment.thumbnail_url ? (
                                 <img 
-                                  src={`data:image/jpeg;base64,${attachment.thumbnail}`}
+                                  src={`${BACKEND_URL}${attachment.thumbnail_url}`}
                                   alt={attachment.filename}
                                   className="w-8 h-8 rounded object-cover mr-2"
                                 />
@@ -715,6 +1009,16 @@ function App() {
               </div>
             ))
           )}
+          {nextCursor && (
+            <div className="text-center">
+              <button
+                onClick={() => loadNextPage.current(nextCursor)}
+                className="px-6 py-2 bg-white border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 transition-colors"
+              >
+                Weitere Einträge laden
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
@@ -844,7 +1148,7 @@ function App() {
                   <input
                     type="file"
                     multiple
-                    accept=".jpg,.jpeg,.png,.gif,.pdf,.doc,.docx,.txt,.xls,.xlsx,.ppt,.pptx,.zip,.rar"
+                    accept=".jpg,.jpeg,.png,.gif,.pdf,.doc,.docx,.txt,.xls,.xlsx,.ppt,.pptx,.mp4,.mov,.m4v,.webm,.zip,.rar"
                     onChange={handleFileInputChange}
                     className="hidden"
                     id="file-upload"
@@ -856,7 +1160,7 @@ function App() {
                     📁 Dateien auswählen
                   </label>
                   <p className="mt-1 text-xs text-gray-500">
-                    Unterstützt: Bilder, PDFs, Office-Dokumente (max. 10MB)
+                    Unterstützt: Bilder, PDFs, Office-Dokumente, Videos (max. 500MB)
                   </p>
                 </div>
 
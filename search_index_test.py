@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Böttcher Wiki Search Index
+Tests German stemming, compound splitting, fuzzy matching, "did you mean" and autocomplete ranking
+without a running backend
+"""
+
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from search_index import (SearchIndex, PrefixSuggester, german_stem, split_compound,
+                          max_edit_distance, bounded_edit_distance)
+
+SAMPLE_ENTRIES = [
+    {
+        "id": "scanner",
+        "question": "Was tun wenn der Scanner nicht funktioniert?",
+        "answer": "Kabel prüfen und den Scanner neu starten",
+        "category": "IT-Support",
+        "tags": ["scanner", "hardware"],
+        "created_at": datetime(2024, 1, 1)
+    },
+    {
+        "id": "waage",
+        "question": "Wie kalibriere ich die Waage?",
+        "answer": "Die Kalibrierung erfolgt monatlich mit Prüfgewichten",
+        "category": "Qualitätskontrolle",
+        "tags": ["waage", "hardware"],
+        "created_at": datetime(2024, 2, 1)
+    },
+    {
+        "id": "treiber",
+        "question": "Scanner Treiber installieren",
+        "answer": "Treiber von der Herstellerseite herunterladen",
+        "category": "IT-Support",
+        "tags": ["scanner", "software"],
+        "created_at": datetime(2024, 3, 1)
+    },
+    {
+        "id": "schweissmaschine",
+        "question": "Wartungsintervall der Schweißmaschine",
+        "answer": "Schweißnähte prüfen und die Wartung dokumentieren",
+        "category": "Wartung",
+        "tags": ["hardware"],
+        "created_at": datetime(2024, 4, 1)
+    },
+    {
+        "id": "maschine",
+        "question": "Maschine ölen",
+        "answer": "Öl nachfüllen, Schweiß und Späne entfernen",
+        "category": "Wartung",
+        "tags": [],
+        "created_at": datetime(2024, 5, 1)
+    }
+]
+
+class SearchIndexTester:
+    def __init__(self):
+        self.test_results = []
+        self.index = SearchIndex()
+        self.index.rebuild(SAMPLE_ENTRIES)
+
+    def log_test(self, test_name, success, message=""):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}: {message}")
+        self.test_results.append({
+            "test": test_name,
+            "success": success,
+            "message": message
+        })
+
+    def check(self, test_name, cases):
+        """Compare (description, actual, expected) cases and log the first mismatch"""
+        for description, actual, expected in cases:
+            if actual != expected:
+                self.log_test(test_name, False, f"{description}: expected {expected!r}, got {actual!r}")
+                return False
+        self.log_test(test_name, True, f"{len(cases)} cases")
+        return True
+
+    def test_stemming(self):
+        """Test that inflected forms and umlaut spellings share one stem"""
+        return self.check("German Stemming", [
+            ("plural", german_stem("maschinen"), german_stem("maschine")),
+            ("genitive plural", german_stem("prüfungen"), german_stem("prüfung")),
+            ("spelled-out umlaut", german_stem("pruefung"), german_stem("prüfung")),
+            ("sharp s", german_stem("straße"), german_stem("strasse")),
+            ("umlauts are folded", german_stem("häuser"), "haeus"),
+            ("-ung outside R2 is kept", german_stem("wartung"), "wartung"),
+            ("-keit and -ig", german_stem("abhängigkeit"), "abhaeng"),
+            ("long inflection", german_stem("aufeinanderfolgenden"), "aufeinanderfolg"),
+        ])
+
+    def test_compound_splitting(self):
+        """Test splitting compounds into known parts, with linking elements"""
+        lexicon = {german_stem(word) for word in ["schweiß", "maschine", "wartung", "intervall", "papier", "stau"]}
+        return self.check("Compound Splitting", [
+            ("two parts", split_compound("schweißmaschine", lexicon), ["schweiss", "maschin"]),
+            ("linking s", split_compound("wartungsintervall", lexicon), ["wartung", "intervall"]),
+            ("unknown modifier", split_compound("schreibmaschine", lexicon), None),
+            ("no known part", split_compound("schreibtisch", lexicon), None),
+        ])
+
+    def test_compound_search(self):
+        """Test that a compound is found by its part, after entries with the whole word"""
+        results = [doc_id for doc_id, _ in self.index.search("maschine")]
+        return self.check("Compound Search", [
+            ("ranking", results, ["maschine", "schweissmaschine"]),
+        ])
+
+    def test_fuzzy_thresholds(self):
+        """Test the allowed number of typos per term length"""
+        return self.check("Fuzzy Thresholds", [
+            ("3 letters", max_edit_distance("abc"), 0),
+            ("4 letters", max_edit_distance("abcd"), 1),
+            ("7 letters", max_edit_distance("abcdefg"), 1),
+            ("8 letters", max_edit_distance("abcdefgh"), 2),
+            ("transposition", bounded_edit_distance("drucker", "drukcer", 1), 1),
+            ("substitution and transposition", bounded_edit_distance("kalibrierung", "kalbirierunk", 2), 2),
+            ("above the bound", bounded_edit_distance("abcd", "wxyz", 1), None),
+            ("length difference", bounded_edit_distance("wartung", "wartungen", 1), None),
+        ])
+
+    def test_fuzzy_matches(self):
+        """Test fuzzy lookups in the vocabulary"""
+        return self.check("Fuzzy Matches", [
+            ("one typo", self.index.fuzzy_matches("traib"), [("treib", 1)]),
+            ("two typos in a short term", self.index.fuzzy_matches("trauc"), []),
+            ("short terms must match exactly", self.index.fuzzy_matches("oel"), []),
+            ("two typos in a long term", self.index.fuzzy_matches("kalibirer"), [("kalibrier", 1)]),
+        ])
+
+    def test_did_you_mean(self):
+        """Test query corrections for unknown words"""
+        return self.check("Did You Mean", [
+            ("typo corrected", self.index.did_you_mean("treibr installieren"), "treiber installieren"),
+            ("known words", self.index.did_you_mean("scanner treiber"), None),
+            ("stop words kept", self.index.did_you_mean("der treibr"), "der treiber"),
+            ("nothing similar", self.index.did_you_mean("xylophon"), None),
+        ])
+
+    def test_suggestion_ranking(self):
+        """Test that titles matching from the first word come first, then newer ones"""
+        questions = [question["id"] for question in self.index.suggest("sc")["questions"]]
+        return self.check("Suggestion Ranking", [
+            ("first word, then newest", questions, ["treiber", "schweissmaschine", "scanner"]),
+            ("limit", len(self.index.suggest("sc", limit=2)["questions"]), 2),
+            ("folded prefix", [q["id"] for q in self.index.suggest("Schweiss")["questions"]], ["schweissmaschine"]),
+            ("no match", self.index.suggest("zz"), {"questions": [], "tags": []}),
+        ])
+
+    def test_tag_suggestions(self):
+        """Test that tags are ordered by usage and updated on removal"""
+        suggester = PrefixSuggester()
+        suggester.rebuild(SAMPLE_ENTRIES + [{"id": "extra", "question": "Hardwaretausch", "tags": ["hardwaretausch"]}])
+        before = suggester.suggest("hard")["tags"]
+        for doc_id in ("scanner", "waage", "schweissmaschine"):
+            suggester.remove(doc_id)
+        after = suggester.suggest("hard")["tags"]
+        return self.check("Tag Suggestions", [
+            ("ordered by usage", before, ["hardware", "hardwaretausch"]),
+            ("unused tags dropped", after, ["hardwaretausch"]),
+        ])
+
+    def run_all_tests(self):
+        """Run all search index tests in sequence"""
+        print("🚀 Starting Böttcher Wiki Search Index Tests")
+        print("=" * 70)
+
+        test_functions = [
+            ("German Stemming", self.test_stemming),
+            ("Compound Splitting", self.test_compound_splitting),
+            ("Compound Search", self.test_compound_search),
+            ("Fuzzy Thresholds", self.test_fuzzy_thresholds),
+            ("Fuzzy Matches", self.test_fuzzy_matches),
+            ("Did You Mean", self.test_did_you_mean),
+            ("Suggestion Ranking", self.test_suggestion_ranking),
+            ("Tag Suggestions", self.test_tag_suggestions)
+        ]
+
+        passed_tests = 0
+        total_tests = len(test_functions)
+
+        for test_name, test_func in test_functions:
+            print(f"\n🔍 Running {test_name}...")
+            try:
+                if test_func():
+                    passed_tests += 1
+            except Exception as e:
+                self.log_test(test_name, False, f"Test function error: {str(e)}")
+
+        print("\n" + "=" * 70)
+        print("📊 TEST SUMMARY")
+        print("=" * 70)
+        print(f"Passed: {passed_tests}/{total_tests}")
+
+        if passed_tests == total_tests:
+            print("🎉 ALL TESTS PASSED!")
+        else:
+            print("❌ SOME TESTS FAILED")
+
+        return passed_tests, total_tests
+
+if __name__ == "__main__":
+    tester = SearchIndexTester()
+    passed, total = tester.run_all_tests()
+
+    # Exit with appropriate code
+    exit(0 if passed == total else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the knowledge list endpoints
+Compares the per-entry cost of the previous model path (KnowledgeEntrySummary
+objects validated and serialized again through response_model) with the
+orjson fast path that encodes the projected MongoDB documents directly.
+
+Run from the repository root with the backend requirements installed:
+    python serialization_benchmark.py
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import orjson
+from pydantic import TypeAdapter
+from server import KnowledgeEntrySummary, LIST_FIELDS, select_fields
+
+PAGE_SIZES = [100, 500]
+ROUNDS = 20
+
+WORDS = ("maschine wartung prüfung schweißen kalibrierung bestellung formular scanner "
+         "drucker fahrrad rahmen bremse schaltung qualität protokoll sicherheit").split()
+
+
+def make_entries(count: int) -> List[dict]:
+    """Documents as returned by MongoDB for the list projection"""
+    random.seed(42)
+    now = datetime.utcnow().replace(microsecond=0)
+    entries = []
+    for i in range(count):
+        created_at = now - timedelta(minutes=i)
+        attachments = [
+            {
+                "id": str(uuid.uuid4()),
+                "filename": f"anhang-{i}-{n}.pdf",
+                "file_type": "documents",
+                "file_size": random.randint(10_000, 5_000_000),
+                "content_type": "application/pdf",
+                "sha256": uuid.uuid4().hex * 2,
+                "thumbnail_url": None,
+                "uploaded_at": created_at
+            }
+            for n in range(random.randint(0, 2))
+        ]
+        entries.append({
+            "id": str(uuid.uuid4()),
+            "question": " ".join(random.choices(WORDS, k=8)).capitalize() + "?",
+            "answer": "\n".join(" ".join(random.choices(WORDS, k=12)) for _ in range(6)),
+            "category": random.choice(["Produktion", "Wartung", "Verwaltung", "IT-Support"]),
+            "tags": random.sample(WORDS, 4),
+            "attachments": attachments,
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+    return entries
+
+
+def model_path(entries: List[dict]) -> bytes:
+    """Previous path: build models, re-validate and serialize them via response_model"""
+    adapter = TypeAdapter(List[KnowledgeEntrySummary])
+    models = [KnowledgeEntrySummary(**select_fields(entry, LIST_FIELDS)) for entry in entries]
+    content = adapter.dump_python(adapter.validate_python(models), mode="json", exclude_unset=True)
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(entries: List[dict]) -> bytes:
+    """Current path: encode the projected documents directly"""
+    return orjson.dumps([select_fields(entry, LIST_FIELDS) for entry in entries])
+
+
+def per_entry_microseconds(func, entries: List[dict]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(entries)
+        best = min(best, time.perf_counter() - start)
+    return best / len(entries) * 1_000_000
+
+
+def main():
+    print(f"{'Entries':>8} {'Model path':>14} {'orjson path':>14} {'Speedup':>9}")
+    for size in PAGE_SIZES:
+        entries = make_entries(size)
+        if json.loads(model_path(entries)) != json.loads(fast_path(entries)):
+            print(f"⚠️  Outputs differ for {size} entries")
+
+        before = per_entry_microseconds(model_path, entries)
+        after = per_entry_microseconds(fast_path, entries)
+        print(f"{size:>8} {before:>11.1f} µs {after:>11.1f} µs {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()